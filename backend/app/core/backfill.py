@@ -0,0 +1,154 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, insert, select
+
+
+# ==============================================================================
+# REPRISES DE DONNÉES (lancées par les migrations ou par manage.py)
+# ==============================================================================
+# Les tables sont passées en paramètre : une migration donne sa copie figée
+# du schéma, manage.py celles des modèles. Traitement par paquets, un commit
+# par paquet (une table de plusieurs millions de lignes ne bloque pas tout).
+# Toutes idempotentes : relancées, elles ne refont que ce qui manque.
+
+
+def migrate_legacy_orders(engine, orders, order_lines, products, chunk_size=1000) -> int:
+    """Remplit placed_at / shipping_address / order_lines depuis les colonnes texte.
+
+    Ne traite que les commandes sans placed_at."""
+    with engine.connect() as conn:
+        catalog = {
+            name: (pid, price)
+            for pid, name, price in conn.execute(select(products.c.id, products.c.name, products.c.price))
+        }
+    migrated = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(
+                    orders.c.id,
+                    orders.c.created_at,
+                    orders.c.total_amount,
+                    orders.c.items_json,
+                    orders.c.shipping_address_json,
+                )
+                .where(orders.c.placed_at.is_(None))
+                .order_by(orders.c.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                return migrated
+            with_lines = set(
+                conn.execute(
+                    select(order_lines.c.order_id)
+                    .where(order_lines.c.order_id.in_([r.id for r in rows]))
+                    .distinct()
+                ).scalars()
+            )
+            updates, lines = [], []
+            for r in rows:
+                try:
+                    placed_at = datetime.fromisoformat(str(r.created_at))
+                except ValueError:
+                    placed_at = datetime.now()
+                try:
+                    address = json.loads(r.shipping_address_json or "{}")
+                except ValueError:
+                    address = {}
+                updates.append({"order_id": r.id, "when": placed_at, "address": address})
+                if r.id in with_lines:
+                    continue
+                try:
+                    names = json.loads(r.items_json or "[]")
+                except ValueError:
+                    names = []
+                for name in names:
+                    product_id, price = catalog.get(str(name), (None, None))
+                    lines.append(
+                        {
+                            "order_id": r.id,
+                            "product_id": product_id,
+                            "name": str(name),
+                            # Prix historique inconnu, sauf si la commande n'a qu'un article
+                            "unit_price": r.total_amount if len(names) == 1 else price,
+                            "quantity": 1,
+                        }
+                    )
+            conn.execute(
+                orders.update()
+                .where(orders.c.id == bindparam("order_id"))
+                .values(placed_at=bindparam("when"), shipping_address=bindparam("address")),
+                updates,
+            )
+            if lines:
+                conn.execute(insert(order_lines), lines)
+        migrated += len(rows)
+        print(f"📦 {migrated} commandes migrées...", flush=True)
+
+
+def backfill_event_timestamps(engine, events, chunk_size=5000) -> int:
+    """Remplit occurred_at depuis l'ancienne colonne texte created_at."""
+    done = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(events.c.id, events.c.created_at)
+                .where(events.c.occurred_at.is_(None))
+                .order_by(events.c.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                return done
+            updates = []
+            for event_id, created_at in rows:
+                try:
+                    when = datetime.fromisoformat(created_at)
+                except (TypeError, ValueError):
+                    when = datetime(1970, 1, 1)  # date illisible : part avec la rétention
+                updates.append({"event_id": event_id, "when": when})
+            conn.execute(
+                events.update()
+                .where(events.c.id == bindparam("event_id"))
+                .values(occurred_at=bindparam("when")),
+                updates,
+            )
+        done += len(rows)
+
+
+def rebuild_review_aggregates(engine, products, reviews) -> int:
+    """Recalcule note moyenne / histogramme de chaque produit depuis les avis."""
+    buckets = [f"rating_{n}" for n in range(1, 6)]
+    with engine.begin() as conn:
+        conn.execute(
+            products.update().values({"rating_count": 0, "rating_sum": 0, **dict.fromkeys(buckets, 0)})
+        )
+
+        per_product = {}
+        for product_id, rating, n in conn.execute(
+            select(reviews.c.product_id, reviews.c.rating, func.count()).group_by(
+                reviews.c.product_id, reviews.c.rating
+            )
+        ):
+            if rating not in range(1, 6):
+                continue
+            values = per_product.setdefault(
+                product_id, {"product_id": product_id, "count": 0, "sum": 0, **{f"n{b}": 0 for b in buckets}}
+            )
+            values["count"] += n
+            values["sum"] += rating * n
+            values[f"nrating_{rating}"] = n
+
+        if per_product:
+            # Paramètres nommés autrement que les colonnes (exigé par SQLAlchemy en executemany)
+            conn.execute(
+                products.update()
+                .where(products.c.id == bindparam("product_id"))
+                .values(
+                    rating_count=bindparam("count"),
+                    rating_sum=bindparam("sum"),
+                    **{b: bindparam(f"n{b}") for b in buckets},
+                ),
+                list(per_product.values()),
+            )
+    return len(per_product)
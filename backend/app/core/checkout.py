@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from app.core.cache import MISSING, LRUCache
+
+# ==============================================================================
+# CRÉATION DES SESSIONS STRIPE CHECKOUT
+# ==============================================================================
+# - L'appel HTTP à Stripe (bloquant) tourne dans un petit pool de threads avec
+#   un timeout, et le nombre d'appels en attente est borné.
+# - Un même panier (même identifiant de checkout généré par le navigateur,
+#   mêmes produits / quantités / prix) reçoit la même session pendant
+#   `reuse_ttl` secondes : double-clic, retour arrière... Les clics simultanés
+#   attendent le même appel au lieu d'en lancer un chacun. Sans identifiant
+#   (clé None), chaque appel crée sa propre session : l'IP seule ne distingue
+#   pas deux clients (NAT, proxy).
+# - Métadonnées : Stripe limite chaque valeur à 500 caractères (50 clés). Un
+#   JSON plus long est découpé en <nom>, <nom>_1, <nom>_2... et recollé par
+#   le webhook (split_metadata / join_metadata).
+
+METADATA_VALUE_MAX = 500
+
+
+class StripeBusy(Exception):
+    pass
+
+
+class StripeTimeout(Exception):
+    pass
+
+
+def cart_fingerprint(*parts) -> str:
+    raw = json.dumps(parts, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def split_metadata(name, value: str, size=METADATA_VALUE_MAX) -> dict:
+    """{name: morceau 0, name_1: morceau 1, ...} ; chaque morceau <= size caractères."""
+    chunks = [value[i:i + size] for i in range(0, len(value), size)] or [""]
+    return {name if n == 0 else f"{name}_{n}": chunk for n, chunk in enumerate(chunks)}
+
+
+def join_metadata(metadata, name) -> str:
+    """Valeur recollée par split_metadata (une seule clé pour les anciennes sessions)."""
+    parts = [metadata.get(name) or ""]
+    for n in itertools.count(1):
+        chunk = metadata.get(f"{name}_{n}")
+        if chunk is None:
+            return "".join(parts)
+        parts.append(chunk)
+
+
+class StripeAPI:
+    """Vrai Stripe (appel synchrone, exécuté par CheckoutClient)."""
+
+    def __init__(self, stripe_module, timeout=10.0, max_retries=1):
+        self.stripe = stripe_module
+        self.stripe.max_network_retries = max_retries
+        if hasattr(stripe_module, "RequestsClient"):
+            # Timeout réseau côté SDK (80 s par défaut)
+            self.stripe.default_http_client = stripe_module.RequestsClient(timeout=timeout)
+
+    def create_session(self, params, idempotency_key=None):
+        return self.stripe.checkout.Session.create(idempotency_key=idempotency_key, **params)
+
+
+class StubStripeAPI:
+    """Faux Stripe pour le local / les tests : la session "payée" redirige
+    directement vers success_url."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self._ids = itertools.count(1)
+
+    def create_session(self, params, idempotency_key=None):
+        if self.delay:
+            time.sleep(self.delay)
+        session_id = f"cs_test_stub_{next(self._ids)}"
+        self.calls.append({"params": params, "idempotency_key": idempotency_key})
+        url = params["success_url"].replace("{CHECKOUT_SESSION_ID}", session_id)
+        return SimpleNamespace(id=session_id, url=url)
+
+
+class CheckoutClient:
+    def __init__(self, api, max_workers=4, max_pending=32, timeout=15.0, reuse_ttl=60.0, cache_size=1024):
+        self.api = api
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.reuse_ttl = reuse_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stripe")
+        self._sessions = LRUCache(maxsize=cache_size, ttl=reuse_ttl)
+        self._inflight = {}
+        self._pending = 0
+
+        self.created = 0
+        self.reused = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    async def _create(self, params, idempotency_key):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise StripeBusy()
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._executor, self.api.create_session, params, idempotency_key
+            )
+            try:
+                session = await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise StripeTimeout()
+            self.created += 1
+            return {"id": session.id, "url": session.url}
+        finally:
+            self._pending -= 1
+
+    async def get_or_create(self, key, params) -> dict:
+        """Session (id, url) pour le panier `key`, créée au besoin (jamais partagée si key est None)."""
+        if key is None:
+            return await self._create(params, None)
+
+        session = self._sessions.get(key)
+        if session is not MISSING:
+            self.reused += 1
+            return session
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.reused += 1
+            return await asyncio.shield(task)
+
+        # Même clé d'idempotence côté Stripe (par fenêtre de `reuse_ttl`) : deux
+        # instances qui créent la même session en même temps obtiennent la même
+        window = int(time.time() // max(self.reuse_ttl, 1))
+        task = asyncio.ensure_future(self._create(params, f"checkout-{key}-{window}"))
+        self._inflight[key] = task
+        try:
+            session = await asyncio.shield(task)
+            self._sessions.set(key, session)
+            return session
+        finally:
+            self._inflight.pop(key, None)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._pending,
+            "created": self.created,
+            "reused": self.reused,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "cached_sessions": self._sessions.stats()["size"],
+        }
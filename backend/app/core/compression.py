@@ -0,0 +1,236 @@
+import gzip
+import threading
+import zlib
+
+import anyio
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle : gzip seulement
+    brotli = None
+
+
+# ==============================================================================
+# COMPRESSION DES RÉPONSES (gzip / brotli selon Accept-Encoding)
+# ==============================================================================
+# - Middleware ASGI : compresse les réponses texte / JSON au-delà de
+#   `minimum_size` octets, en flux pour les StreamingResponse (export CSV).
+#   Une réponse qui a déjà un Content-Encoding passe telle quelle.
+# - Réponses en cache (listes produits / avis) : chaque variante compressée
+#   est calculée une fois et gardée avec le corps (PrecompressedPayload),
+#   donc une compression par changement du catalogue, pas par requête.
+# - ETag : une réponse compressée reçoit un ETag faible (W/"...") ;
+#   If-None-Match compare en mode faible, les 304 continuent de marcher.
+# - Les gros corps sont compressés dans un thread pour ne pas bloquer la boucle.
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/x-ndjson",  # export des commandes (le plus gros flux)
+    "application/xml",
+    "image/svg+xml",
+    "text/",  # dont text/csv
+)
+OFFLOAD_SIZE = 256 * 1024  # octets : au-delà, compression hors event loop
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """{encodage: q} depuis Accept-Encoding (q=0 = refusé)."""
+    accepted = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+class ResponseCompressor:
+    def __init__(self, encodings=("br", "gzip"), minimum_size=500, gzip_level=6, brotli_quality=4):
+        # Ordre = préférence du serveur à q égal ; br ignoré si le module manque
+        self.encodings = [e for e in encodings if e == "gzip" or (e == "br" and brotli is not None)]
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._lock = threading.Lock()
+        self.compressed = {e: 0 for e in self.encodings}
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def negotiate(self, accept_encoding):
+        accepted = parse_accept_encoding(accept_encoding)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            q = accepted.get(encoding, accepted.get("*", 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            out = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            out = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        self._record(encoding, len(body), len(out))
+        return out
+
+    async def compress_async(self, body: bytes, encoding: str) -> bytes:
+        if len(body) >= OFFLOAD_SIZE:
+            return await anyio.to_thread.run_sync(self.compress, body, encoding)
+        return self.compress(body, encoding)
+
+    def stream(self, encoding):
+        """Compresseur incrémental : (compress(chunk) -> bytes, finish() -> bytes)."""
+        if encoding == "br":
+            c = brotli.Compressor(quality=self.brotli_quality)
+            return (lambda chunk: c.process(chunk) + c.flush()), c.finish
+        c = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)  # 31 = en-tête gzip
+        return (lambda chunk: c.compress(chunk) + c.flush(zlib.Z_SYNC_FLUSH)), c.flush
+
+    def _record(self, encoding, size_in, size_out):
+        with self._lock:
+            self.compressed[encoding] += 1
+            self.bytes_in += size_in
+            self.bytes_out += size_out
+
+    def stats(self) -> dict:
+        return {
+            "encodings": self.encodings,
+            "minimum_size": self.minimum_size,
+            "compressed": dict(self.compressed),
+            "ratio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+        }
+
+
+class PrecompressedPayload:
+    """Corps JSON en cache + ses variantes compressées, calculées à la demande."""
+
+    __slots__ = ("body", "variants")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.variants = {}
+
+    async def encoded(self, compressor: ResponseCompressor, accept_encoding):
+        """(corps, encodage ou None) à envoyer pour cet Accept-Encoding."""
+        if len(self.body) < compressor.minimum_size:
+            return self.body, None
+        encoding = compressor.negotiate(accept_encoding)
+        if encoding is None:
+            return self.body, None
+        variant = self.variants.get(encoding)
+        if variant is None:
+            # Deux requêtes simultanées peuvent la calculer toutes les deux : sans gravité
+            variant = self.variants[encoding] = await compressor.compress_async(self.body, encoding)
+        return variant, encoding
+
+
+def _weak_etag(value: bytes) -> bytes:
+    return value if value.startswith(b"W/") else b"W/" + value
+
+
+class CompressionMiddleware:
+    def __init__(self, app, compressor: ResponseCompressor):
+        self.app = app
+        self.compressor = compressor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = self.compressor.negotiate(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        compressor = self.compressor
+        state = {"start": None, "stream": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                status = message["status"]
+                if (
+                    b"content-encoding" in headers
+                    or status < 200
+                    or status in (204, 304)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    state["start"] = False  # on laisse passer
+                    await send(message)
+                else:
+                    state["start"] = message  # en attente du premier morceau du corps
+                return
+
+            if message["type"] != "http.response.body" or state["start"] is False:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if state["stream"] is not None:
+                compress, finish = state["stream"]
+                chunk = compress(body) if body else b""
+                if not more_body:
+                    chunk += finish()
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                return
+
+            start, state["start"] = state["start"], False
+            headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+            if not more_body and len(body) < compressor.minimum_size:
+                # Trop petit : le gain ne couvre pas le coût
+                await send(start)
+                await send(message)
+                return
+
+            headers = self._encoded_headers(headers, encoding)
+            if more_body:
+                # StreamingResponse : compression morceau par morceau
+                state["start"] = True
+                state["stream"] = compressor.stream(encoding)
+                compress, _ = state["stream"]
+                await send({**start, "headers": headers})
+                await send({"type": "http.response.body", "body": compress(body), "more_body": True})
+                return
+
+            compressed = await compressor.compress_async(body, encoding)
+            headers.append((b"content-length", str(len(compressed)).encode()))
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _encoded_headers(headers, encoding):
+        out = []
+        vary = False
+        for key, value in headers:
+            lower = key.lower()
+            if lower == b"etag":
+                value = _weak_etag(value)
+            elif lower == b"vary":
+                vary = True
+                if b"accept-encoding" not in value.lower():
+                    value += b", Accept-Encoding"
+            out.append((key, value))
+        if not vary:
+            out.append((b"vary", b"Accept-Encoding"))
+        out.append((b"content-encoding", encoding.encode()))
+        return out
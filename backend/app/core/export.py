@@ -0,0 +1,174 @@
+import json
+import os
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+from sqlalchemy import func, select
+
+
+# ==============================================================================
+# EXPORT COLONNAIRE DES ÉVÉNEMENTS (Parquet / Arrow IPC) POUR L'ANALYSE
+# ==============================================================================
+# Les analystes lisent ces fichiers au lieu d'interroger la base de prod.
+# - Lecture par paquets via un curseur côté serveur (stream_results) : la
+#   mémoire dépend de `chunk_size`, pas de la taille de la table.
+# - Un fichier par (jour, type d'événement) et par paquet, rangé façon Hive :
+#     <dossier>/day=2025-01-02/event_type=view_item/part-<id min>-<id max>.parquet
+#   Les valeurs de partition sont encodées en %XX comme Hive (pyarrow les
+#   décode) : un event_type reçu du public ne peut pas sortir du dossier.
+# - Les clés de metadata_json deviennent des colonnes `meta_<clé>`.
+# - Reprise : le dernier id exporté est gardé dans <dossier>/_state.json,
+#   réécrit après chaque paquet. Les événements des `lag` dernières secondes
+#   sont laissés pour le passage suivant (transactions encore en cours).
+#
+# pyarrow (requirements.txt) n'est importé qu'à l'export : l'API démarre sans.
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+BASE_COLUMNS = ("id", "occurred_at", "event_type", "user_id", "page_url", "product_id", "product_name")
+
+
+def _load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("L'export colonnaire nécessite pyarrow : pip install pyarrow")
+    return pyarrow
+
+
+def partition_value(value) -> str:
+    """Segment de chemin sûr : lettres, chiffres, `_ . - ~` gardés, le reste en %XX."""
+    # Toujours préfixé par "<colonne>=" : même ".." reste un nom de dossier ordinaire
+    return quote(str(value), safe="") if value not in (None, "") else "unknown"
+
+
+def flatten_event(row: dict) -> dict:
+    """Ligne d'export : colonnes de base + metadata_json aplati."""
+    flat = {name: row.get(name) for name in BASE_COLUMNS}
+    try:
+        metadata = json.loads(row.get("metadata_json") or "{}")
+    except ValueError:
+        metadata = {"raw": row.get("metadata_json")}
+    if isinstance(metadata, dict):
+        for key, value in metadata.items():
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, separators=(",", ":"))
+            flat[f"meta_{key}"] = value
+    return flat
+
+
+def _column(pa, values):
+    # Types mélangés dans une même clé de metadata (ex : 3 puis "3") -> texte
+    kinds = {type(v) for v in values if v is not None}
+    if len(kinds) > 1 and not kinds <= {int, float}:
+        values = [None if v is None else str(v) for v in values]
+    return pa.array(values)
+
+
+class EventExporter:
+    def __init__(self, out_dir, fmt="parquet", chunk_size=50_000, compression="zstd", lag=60.0):
+        if fmt not in FORMATS:
+            raise ValueError(f"Format inconnu : {fmt} ({', '.join(FORMATS)})")
+        self.pa = _load_pyarrow()
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.lag = lag
+        self.state_path = os.path.join(out_dir, "_state.json")
+
+    # --- État (reprise) ---
+
+    def load_state(self) -> dict:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"last_id": 0, "exported": 0}
+
+    def save_state(self, state):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)  # atomique : jamais d'état à moitié écrit
+
+    # --- Écriture ---
+
+    def _write(self, rows):
+        groups = {}
+        for row in rows:
+            day = row["occurred_at"].strftime("%Y-%m-%d") if row["occurred_at"] else "unknown"
+            groups.setdefault((day, partition_value(row["event_type"])), []).append(flatten_event(row))
+
+        pa = self.pa
+        for (day, event_type), flat in groups.items():
+            names = list(BASE_COLUMNS) + sorted({k for r in flat for k in r} - set(BASE_COLUMNS))
+            arrays = [_column(pa, [r.get(n) for r in flat]) for n in names]
+            tbl = pa.Table.from_arrays(arrays, names=names)
+
+            folder = os.path.join(self.out_dir, f"day={day}", f"event_type={event_type}")
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(
+                folder, f"part-{flat[0]['id']}-{flat[-1]['id']}{FORMATS[self.fmt]}"
+            )
+            if self.fmt == "parquet":
+                pa.parquet.write_table(tbl, path, compression=self.compression)
+            else:
+                pa.feather.write_feather(tbl, path, compression=self.compression)
+
+    def run(self, conn, sources) -> int:
+        """Exporte les événements plus récents que le dernier id exporté.
+
+        `sources` = tables à lire (table chaude + tables mensuelles)."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        state = self.load_state()
+        since = state["last_id"]
+        until = datetime.now() - timedelta(seconds=self.lag)
+
+        # Borne haute figée au départ (dernier id assez ancien) : ce qui arrive
+        # pendant l'export, ou est encore en cours d'écriture, attendra
+        upper = since
+        bounds = []
+        for source in sources:
+            low, high = conn.execute(
+                select(
+                    func.min(source.c.id),
+                    func.max(source.c.id).filter(
+                        (source.c.occurred_at < until) | source.c.occurred_at.is_(None)
+                    ),
+                ).where(source.c.id > since)
+            ).one()
+            if low is not None:
+                bounds.append((low, source))
+                upper = max(upper, high or since)
+        # Tables lues par id croissant : last_id ne saute jamais de lignes
+        bounds.sort(key=lambda b: b[0])
+
+        exported = 0
+        for _, source in bounds:
+            stmt = (
+                select(
+                    source.c.id,
+                    source.c.occurred_at,
+                    source.c.event_type,
+                    source.c.user_id,
+                    source.c.page_url,
+                    source.c.product_id,
+                    source.c.product_name,
+                    source.c.metadata_json,
+                )
+                .where(source.c.id > since, source.c.id <= upper)
+                .order_by(source.c.id)
+            )
+            result = conn.execution_options(stream_results=True, yield_per=self.chunk_size).execute(stmt)
+            for chunk in result.mappings().partitions():
+                rows = [dict(r) for r in chunk]
+                self._write(rows)
+                exported += len(rows)
+                state["last_id"] = max(state["last_id"], rows[-1]["id"])
+                state["exported"] += len(rows)
+                state["updated_at"] = datetime.now().isoformat()
+                self.save_state(state)
+                print(f"📦 {exported} événements exportés (id <= {rows[-1]['id']})", flush=True)
+        return exported
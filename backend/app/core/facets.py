@@ -0,0 +1,106 @@
+import bisect
+import threading
+import time
+
+
+# ==============================================================================
+# FACETTES DU CATALOGUE (catégories + tranches de prix) EN MÉMOIRE
+# ==============================================================================
+# Pour chaque catégorie on garde la liste triée des prix : compter les produits
+# d'une catégorie dans [min, max] = deux bisect, sans toucher la base.
+# - Compteurs par catégorie : filtre de prix appliqué, filtre de catégorie
+#   ignoré (on affiche aussi les autres catégories pour pouvoir changer).
+# - Tranches de prix : filtre de catégorie appliqué, filtre de prix ignoré.
+# L'index est tenu à jour par les routes d'écriture de cette instance et
+# rechargé depuis la base toutes les `reload_interval` secondes (écritures
+# faites par d'autres instances).
+
+
+class FacetIndex:
+    def __init__(self, bucket_edges=(50, 100, 250, 500, 1000), reload_interval=300.0):
+        self.bucket_edges = sorted(bucket_edges)
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._products = {}  # id -> (catégorie, prix)
+        self._prices = {}  # catégorie -> prix triés
+        self.loaded_at = None
+
+    @property
+    def stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.reload_interval
+
+    def load(self, rows):
+        """Remplace tout l'index par `rows` = [(id, catégorie, prix), ...]."""
+        products, prices = {}, {}
+        for pid, category, price in rows:
+            price = price or 0.0
+            products[pid] = (category, price)
+            prices.setdefault(category, []).append(price)
+        for values in prices.values():
+            values.sort()
+        with self._lock:
+            self._products = products
+            self._prices = prices
+            self.loaded_at = time.monotonic()
+
+    def _remove_locked(self, pid):
+        old = self._products.pop(pid, None)
+        if old is None:
+            return
+        category, price = old
+        values = self._prices[category]
+        del values[bisect.bisect_left(values, price)]
+        if not values:
+            del self._prices[category]
+
+    def upsert(self, pid, category, price):
+        price = price or 0.0
+        with self._lock:
+            self._remove_locked(pid)
+            self._products[pid] = (category, price)
+            bisect.insort(self._prices.setdefault(category, []), price)
+
+    def remove(self, pid):
+        with self._lock:
+            self._remove_locked(pid)
+
+    @staticmethod
+    def _count(values, min_price, max_price):
+        lo = 0 if min_price is None else bisect.bisect_left(values, min_price)
+        hi = len(values) if max_price is None else bisect.bisect_right(values, max_price)
+        return max(0, hi - lo)
+
+    def facets(self, category=None, min_price=None, max_price=None) -> dict:
+        with self._lock:
+            categories = {
+                cat: self._count(values, min_price, max_price)
+                for cat, values in self._prices.items()
+            }
+            if category is not None:
+                selected = [self._prices.get(category, [])]
+            else:
+                selected = list(self._prices.values())
+
+            buckets = []
+            edges = [None] + self.bucket_edges + [None]
+            for low, high in zip(edges, edges[1:]):
+                count = 0
+                for values in selected:
+                    lo = 0 if low is None else bisect.bisect_left(values, low)
+                    hi = len(values) if high is None else bisect.bisect_left(values, high)
+                    count += hi - lo
+                buckets.append({"min": low, "max": high, "count": count})
+
+        total = categories.get(category, 0) if category is not None else sum(categories.values())
+        return {
+            "total": total,
+            "categories": [
+                {"value": cat, "count": n}
+                for cat, n in sorted(categories.items(), key=lambda kv: (-kv[1], str(kv[0])))
+                if n
+            ],
+            "price_buckets": buckets,
+        }
+
+    def stats(self) -> dict:
+        return {"products": len(self._products), "categories": len(self._prices)}
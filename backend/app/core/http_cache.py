@@ -0,0 +1,61 @@
+import hashlib
+import secrets
+import threading
+import time
+
+from fastapi import Request, Response
+
+
+# ==============================================================================
+# REQUÊTES CONDITIONNELLES HTTP (ETag / If-None-Match)
+# ==============================================================================
+# Les ETags sont dérivés d'un compteur de version incrémenté par les routes
+# d'écriture : vérifier If-None-Match ne demande ni requête SQL ni sérialisation.
+# Le compteur est propre à chaque instance ; BOOT_ID évite qu'une instance
+# réponde 304 à un ETag émis par une autre (ou avant un redémarrage).
+# Une instance qui ne voit passer aucune écriture ne bumpe jamais son
+# compteur : l'époque (`epoch_seconds`) fait tourner l'ETag à intervalle fixe,
+# une instance ne peut donc pas confirmer une donnée périmée indéfiniment.
+
+BOOT_ID = secrets.token_hex(4)
+
+
+class VersionCounter:
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key=None) -> int:
+        return self._versions.get(key, 0)
+
+    def bump(self, key=None) -> int:
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            return self._versions[key]
+
+
+def make_etag(*parts, epoch_seconds=0) -> str:
+    epoch = int(time.time() // epoch_seconds) if epoch_seconds > 0 else 0
+    raw = "-".join(str(p) for p in (BOOT_ID, epoch, *parts))
+    return '"' + hashlib.sha1(raw.encode()).hexdigest()[:20] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match utilise la comparaison faible : on ignore le préfixe W/
+    candidates = [c.strip().removeprefix("W/") for c in header.split(",")]
+    return etag in candidates
+
+
+def conditional(request: Request, response: Response, etag: str, cache_control: str):
+    """Retourne une réponse 304 si le client a déjà cette version, sinon
+    positionne les en-têtes de validation sur la réponse et retourne None."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
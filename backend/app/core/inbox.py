@@ -0,0 +1,93 @@
+import json
+import threading
+from datetime import datetime
+
+from sqlalchemy import select
+
+
+# ==============================================================================
+# INBOX : ÉVÉNEMENTS ENTRANTS STOCKÉS PUIS APPLIQUÉS DANS L'ORDRE
+# ==============================================================================
+# Le webhook vérifie la signature, insère l'événement brut (clé unique =
+# id de l'événement, donc les renvois sont ignorés) et répond tout de suite.
+# Le processeur applique ensuite les événements "pending" par ordre d'arrivée :
+# un lot par transaction (verrouillé avec SKIP LOCKED sur Postgres), un
+# SAVEPOINT par événement pour qu'un échec n'annule pas le reste du lot.
+
+PENDING = "pending"
+PROCESSED = "processed"
+FAILED = "failed"
+
+
+class InboxProcessor:
+    def __init__(
+        self, session_factory, model, apply, batch_size=50, max_attempts=5, poll_interval=1.0
+    ):
+        self.session_factory = session_factory
+        self.model = model
+        self.apply = apply  # callable(db, event_dict), dans la transaction courante
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.processed = 0
+        self.failed = 0
+
+    def _process(self, db, row):
+        try:
+            with db.begin_nested():
+                self.apply(db, json.loads(row.payload))
+            row.status = PROCESSED
+            row.processed_at = datetime.now()
+            row.last_error = None
+            self.processed += 1
+        except Exception as e:
+            row.attempts += 1
+            row.last_error = f"{type(e).__name__}: {e}"[:500]
+            if row.attempts >= self.max_attempts:
+                row.status = FAILED
+                self.failed += 1
+                print(f"❌ Événement {row.event_id} abandonné : {row.last_error}", flush=True)
+
+    def run_once(self) -> int:
+        m = self.model
+        db = self.session_factory()
+        try:
+            stmt = (
+                select(m).where(m.status == PENDING).order_by(m.id).limit(self.batch_size)
+            )
+            if db.get_bind().dialect.name == "postgresql":
+                stmt = stmt.with_for_update(skip_locked=True)
+            rows = db.scalars(stmt).all()
+            for row in rows:
+                self._process(db, row)
+            db.commit()
+            return len(rows)
+        finally:
+            db.close()
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                print(f"❌ Inbox processor: {e}", flush=True)
+                processed = 0
+            if processed < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="inbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {"processed": self.processed, "failed": self.failed}
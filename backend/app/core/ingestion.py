@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import insert
+
+
+# ==============================================================================
+# FILE D'INGESTION ANALYTICS (BUFFER + INSERTS GROUPÉS)
+# ==============================================================================
+# Les beacons de tracking sont acceptés immédiatement (mis en mémoire), puis un
+# thread dédié les écrit en base par paquets : un seul INSERT multi-lignes et un
+# seul commit par lot au lieu d'un commit par événement.
+
+
+class EventIngestionQueue:
+    def __init__(
+        self,
+        session_factory,
+        table,
+        batch_size=500,
+        flush_interval=1.0,
+        max_pending=50_000,
+        on_flush=None,
+    ):
+        self.session_factory = session_factory
+        self.table = table
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max(self.batch_size, max_pending)
+        # Hook optionnel appelé dans la même transaction que l'INSERT du lot
+        self.on_flush = on_flush
+
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+        # Compteurs (lus par /api/v1/admin/runtime)
+        self.accepted = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.last_flush_ms = 0.0
+
+    # --- Côté requête ---
+
+    def offer(self, row: dict) -> bool:
+        """Ajoute un événement au buffer. Retourne False si le buffer est plein."""
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending.append(row)
+            self.accepted += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+            return True
+
+    # --- Cycle de vie ---
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="analytics-ingestion", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Arrêt propre : on réveille le thread et on vide tout le buffer."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        # Sécurité : si le thread n'a pas tout vidé (ou n'a jamais démarré)
+        while self.flush():
+            pass
+
+    # --- Écriture en base ---
+
+    def _take_batch(self):
+        with self._cond:
+            n = min(self.batch_size, len(self._pending))
+            return [self._pending.popleft() for _ in range(n)]
+
+    def flush(self) -> int:
+        """Écrit un lot en base. Retourne le nombre d'événements traités."""
+        batch = self._take_batch()
+        if not batch:
+            return 0
+
+        start = time.perf_counter()
+        db = self.session_factory()
+        try:
+            # executemany : SQLAlchemy 2 le transforme en INSERT ... VALUES (...), (...)
+            db.execute(insert(self.table), batch)
+            if self.on_flush:
+                self.on_flush(db, batch)
+            db.commit()
+            self.flushed += len(batch)
+            self.batches += 1
+        except Exception as e:
+            db.rollback()
+            self.failed_batches += 1
+            self.dropped += len(batch)
+            print(f"❌ Erreur flush analytics ({len(batch)} events): {e}", flush=True)
+        finally:
+            db.close()
+            self.last_flush_ms = round((time.perf_counter() - start) * 1000, 2)
+        return len(batch)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                while self.flush():
+                    pass
+                return
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "accepted": self.accepted,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "last_flush_ms": self.last_flush_ms,
+        }
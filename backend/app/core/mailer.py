@@ -0,0 +1,35 @@
+import threading
+
+
+# ==============================================================================
+# ENVOI D'EMAILS (Resend en prod, faux expéditeur en local / tests)
+# ==============================================================================
+
+
+class ResendSender:
+    def __init__(self, resend_module, from_address):
+        self.resend = resend_module
+        self.from_address = from_address
+
+    def send(self, to, subject, html):
+        # Lève une exception en cas d'erreur : l'outbox se charge des nouveaux essais
+        self.resend.Emails.send(
+            {"from": self.from_address, "to": to, "subject": subject, "html": html}
+        )
+
+
+class FakeSender:
+    """Garde les emails en mémoire au lieu de les envoyer."""
+
+    def __init__(self, fail_times=0):
+        self.sent = []
+        self.fail_times = fail_times  # pour simuler un fournisseur en panne
+        self._lock = threading.Lock()
+
+    def send(self, to, subject, html):
+        with self._lock:
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise RuntimeError("Fake sender: échec simulé")
+            self.sent.append({"to": to, "subject": subject, "html": html})
+        print(f"📧 [FAKE] {subject} -> {to}", flush=True)
@@ -0,0 +1,230 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+
+# ==============================================================================
+# MÉTRIQUES HTTP + SQL AU FORMAT PROMETHEUS (GET /metrics)
+# ==============================================================================
+# - Un middleware ASGI chronomètre chaque requête et l'étiquette avec le modèle
+#   de route ("/api/v1/products/{id}", pas l'URL réelle : cardinalité bornée).
+# - Des hooks SQLAlchemy (before/after_cursor_execute) comptent les requêtes
+#   SQL et leur durée, attribuées à la requête HTTP en cours via un ContextVar
+#   (copié dans le threadpool des routes sync et dans les greenlets async).
+#   Beaucoup de requêtes SQL pour un seul appel = N+1 probable.
+# - Tout est en mémoire, par instance : Prometheus agrège les instances.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED = "<unmatched>"  # 404 : on n'étiquette pas avec l'URL demandée
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+current_request = ContextVar("current_request_stats", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # dernière case = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(**labels) -> str:
+    def escape(v):
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = {}  # (méthode, route) -> Histogram (secondes)
+        self.statements = {}  # (méthode, route) -> Histogram (requêtes SQL par appel)
+        self.db_seconds = {}  # (méthode, route) -> secondes passées en base
+        self.responses = {}  # (méthode, route, status) -> nombre
+        self.in_flight = 0
+        self.db_statements_total = 0  # y compris hors requête HTTP (threads de fond)
+        self.db_seconds_total = 0.0
+        self.started_at = time.time()
+
+    # --- Enregistrement ---
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, method, route, status, seconds, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.statements[key] = Histogram(STATEMENT_BUCKETS)
+                self.db_seconds[key] = 0.0
+            self.latency[key].observe(seconds)
+            self.statements[key].observe(stats.statements)
+            self.db_seconds[key] += stats.db_seconds
+            status_key = (method, route, status)
+            self.responses[status_key] = self.responses.get(status_key, 0) + 1
+
+    def statement_executed(self, seconds):
+        stats = current_request.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += seconds
+        with self._lock:
+            self.db_statements_total += 1
+            self.db_seconds_total += seconds
+
+    # --- Export texte Prometheus ---
+
+    def _histogram(self, lines, name, help_text, histograms):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (method, route), h in sorted(histograms.items()):
+            cumulative = 0
+            for edge, n in zip(list(h.buckets) + ["+Inf"], h.counts):
+                cumulative += n
+                le = edge if edge == "+Inf" else f"{edge:g}"
+                lines.append(f"{name}_bucket{_labels(method=method, route=route, le=le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(method=method, route=route)} {h.sum:.6f}")
+            lines.append(f"{name}_count{_labels(method=method, route=route)} {h.count}")
+
+    def render(self, pools=None) -> str:
+        """Texte d'exposition Prometheus. `pools` = {nom: PoolMetrics}."""
+        lines = []
+        with self._lock:
+            self._histogram(
+                lines,
+                "http_request_duration_seconds",
+                "Durée des requêtes HTTP par route.",
+                self.latency,
+            )
+            self._histogram(
+                lines,
+                "http_request_db_statements",
+                "Requêtes SQL exécutées par requête HTTP.",
+                self.statements,
+            )
+            lines.append("# HELP http_request_db_seconds_total Temps passé en base par route.")
+            lines.append("# TYPE http_request_db_seconds_total counter")
+            for (method, route), seconds in sorted(self.db_seconds.items()):
+                lines.append(
+                    f"http_request_db_seconds_total{_labels(method=method, route=route)} {seconds:.6f}"
+                )
+            lines.append("# HELP http_requests_total Réponses HTTP par route et code.")
+            lines.append("# TYPE http_requests_total counter")
+            for (method, route, status), n in sorted(self.responses.items()):
+                lines.append(
+                    f"http_requests_total{_labels(method=method, route=route, status=status)} {n}"
+                )
+            lines.append("# HELP http_requests_in_flight Requêtes HTTP en cours.")
+            lines.append("# TYPE http_requests_in_flight gauge")
+            lines.append(f"http_requests_in_flight {self.in_flight}")
+            lines.append("# HELP db_statements_total Requêtes SQL exécutées (toutes origines).")
+            lines.append("# TYPE db_statements_total counter")
+            lines.append(f"db_statements_total {self.db_statements_total}")
+            lines.append("# HELP db_statement_seconds_total Temps total des requêtes SQL.")
+            lines.append("# TYPE db_statement_seconds_total counter")
+            lines.append(f"db_statement_seconds_total {self.db_seconds_total:.6f}")
+
+        pool_stats = {}
+        for pool_name, metrics in (pools or {}).items():
+            pool_stats[pool_name] = {**metrics.stats(), "wait_seconds": metrics.wait_total_ms / 1000}
+        for name, help_text, kind, field in (
+            ("db_pool_checkouts_total", "Connexions obtenues du pool.", "counter", "checkouts"),
+            ("db_pool_timeouts_total", "Attentes de connexion expirées (pool saturé).", "counter", "timeouts"),
+            ("db_pool_connects_total", "Connexions ouvertes vers la base.", "counter", "connects"),
+            ("db_pool_wait_seconds_total", "Temps total d'attente d'une connexion.", "counter", "wait_seconds"),
+            ("db_pool_checked_out", "Connexions actuellement empruntées.", "gauge", "checked_out"),
+            ("db_pool_size", "Taille du pool.", "gauge", "size"),
+        ):
+            samples = []
+            for pool_name, stats in sorted(pool_stats.items()):
+                value = stats.get(field)
+                if value is not None:
+                    samples.append(f"{name}{_labels(engine=pool_name)} {value:g}")
+            if samples:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(samples)
+
+        lines.append("# HELP process_start_time_seconds Démarrage du process (epoch).")
+        lines.append("# TYPE process_start_time_seconds gauge")
+        lines.append(f"process_start_time_seconds {self.started_at:.3f}")
+        return "\n".join(lines) + "\n"
+
+
+# --- Collecte ---
+
+class MetricsMiddleware:
+    """Middleware ASGI pur (pas de BaseHTTPMiddleware : ni tâche ni copie du corps)."""
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = [500]  # exception non gérée : compté comme 500
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        self.registry.request_started()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            self.registry.request_finished(
+                scope["method"],
+                getattr(route, "path", UNMATCHED),
+                status[0],
+                time.perf_counter() - start,
+                stats,
+            )
+            current_request.reset(token)
+
+
+def instrument_queries(engine, registry: MetricsRegistry):
+    """Compte et chronomètre les requêtes SQL d'un moteur sync (ou `.sync_engine`)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        registry.statement_executed(time.perf_counter() - conn.info["query_start"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        conn = context.connection
+        if conn is not None and conn.info.get("query_start"):
+            registry.statement_executed(time.perf_counter() - conn.info["query_start"].pop())
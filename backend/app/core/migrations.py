@@ -0,0 +1,99 @@
+import importlib
+import pkgutil
+import time
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+
+from app.models import SchemaVersion
+
+
+# ==============================================================================
+# MIGRATIONS VERSIONNÉES (appliquées hors démarrage : `python manage.py migrate`)
+# ==============================================================================
+# Chaque module de app/migrations/ définit VERSION (entier croissant),
+# DESCRIPTION et upgrade(engine). Les versions appliquées sont notées dans la
+# table `schema_version` ; le démarrage de l'API se contente de lire la plus
+# haute et de la comparer à la dernière migration connue.
+# La migration 1 crée le schéma courant complet : les suivantes doivent donc
+# être idempotentes (elles passent aussi sur une base neuve déjà à jour).
+
+# Verrou consultatif PostgreSQL : deux `migrate` lancés en même temps
+# (déploiement de plusieurs instances) s'attendent au lieu de se marcher dessus
+MIGRATION_LOCK_ID = 7_031_964
+
+
+class SchemaOutdated(RuntimeError):
+    pass
+
+
+def load_migrations(package="app.migrations"):
+    """Modules de migration triés par VERSION."""
+    pkg = importlib.import_module(package)
+    found = {}
+    for info in pkgutil.iter_modules(pkg.__path__):
+        module = importlib.import_module(f"{package}.{info.name}")
+        version = getattr(module, "VERSION", None)
+        if version is None:
+            continue
+        if version in found:
+            raise ValueError(f"Migration {version} en double : {found[version].__name__}, {module.__name__}")
+        found[version] = module
+    return [found[v] for v in sorted(found)]
+
+
+def latest_version(migrations) -> int:
+    return migrations[-1].VERSION if migrations else 0
+
+
+def current_version(conn) -> int:
+    """Plus haute version appliquée (0 si la table n'existe pas encore)."""
+    if not conn.dialect.has_table(conn, SchemaVersion.__tablename__):
+        return 0
+    return conn.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+
+
+def check(engine, migrations):
+    """Lève SchemaOutdated si des migrations n'ont pas été appliquées."""
+    with engine.connect() as conn:
+        current = current_version(conn)
+    latest = latest_version(migrations)
+    if current < latest:
+        raise SchemaOutdated(
+            f"Schéma en version {current}, le code attend {latest} : "
+            "lancer `python manage.py migrate`"
+        )
+    return current
+
+
+def migrate(engine, migrations, target=None):
+    """Applique dans l'ordre les migrations pas encore passées. Retourne leurs versions."""
+    SchemaVersion.__table__.create(bind=engine, checkfirst=True)
+    lock = engine.connect() if engine.dialect.name == "postgresql" else None
+    if lock is not None:
+        lock.exec_driver_sql(f"SELECT pg_advisory_lock({MIGRATION_LOCK_ID})")
+    try:
+        with engine.connect() as conn:
+            current = current_version(conn)
+        applied = []
+        for m in migrations:
+            if m.VERSION <= current or (target is not None and m.VERSION > target):
+                continue
+            print(f"🧱 Migration {m.VERSION} : {m.DESCRIPTION}", flush=True)
+            t0 = time.perf_counter()
+            m.upgrade(engine)
+            with engine.begin() as conn:
+                conn.execute(
+                    insert(SchemaVersion).values(
+                        version=m.VERSION,
+                        name=m.__name__.rsplit(".", 1)[-1],
+                        applied_at=datetime.now(),
+                        duration_ms=round((time.perf_counter() - t0) * 1000, 1),
+                    )
+                )
+            applied.append(m.VERSION)
+        return applied
+    finally:
+        if lock is not None:
+            lock.exec_driver_sql(f"SELECT pg_advisory_unlock({MIGRATION_LOCK_ID})")
+            lock.close()
@@ -0,0 +1,141 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+
+# ==============================================================================
+# OUTBOX : MESSAGES DURABLES + WORKER
+# ==============================================================================
+# Les messages (emails...) sont insérés dans la table outbox dans la même
+# transaction que la donnée métier. Un worker séparé (`manage.py outbox-worker`)
+# les réclame par lots, les envoie avec une concurrence bornée et :
+#   - succès  -> status "sent"
+#   - échec   -> nouvel essai plus tard (backoff exponentiel + jitter)
+#   - trop d'échecs -> status "dead" (dead-letter, à traiter à la main)
+
+PENDING = "pending"
+SENT = "sent"
+DEAD = "dead"
+
+
+class OutboxWorker:
+    def __init__(
+        self,
+        session_factory,
+        model,
+        handlers,
+        concurrency=4,
+        batch_size=20,
+        max_attempts=8,
+        base_delay=5.0,
+        max_delay=3600.0,
+        lease=300.0,
+        poll_interval=2.0,
+    ):
+        self.session_factory = session_factory
+        self.model = model
+        self.handlers = handlers  # kind -> callable(payload), lève une exception si échec
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="outbox"
+        )
+        self._stop = threading.Event()
+
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+
+    def backoff(self, attempts) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def claim(self):
+        """Réserve un lot de messages dus (bail de `lease` secondes)."""
+        m = self.model
+        db = self.session_factory()
+        try:
+            now = datetime.now()
+            stmt = (
+                select(m)
+                .where(m.status == PENDING, m.next_attempt_at <= now)
+                .order_by(m.next_attempt_at, m.id)
+                .limit(self.batch_size)
+            )
+            if db.get_bind().dialect.name == "postgresql":
+                # Plusieurs workers en parallèle : chacun prend des lignes différentes
+                stmt = stmt.with_for_update(skip_locked=True)
+            messages = db.scalars(stmt).all()
+            claimed = []
+            for msg in messages:
+                # Si le worker meurt, le message redevient dû à la fin du bail
+                msg.next_attempt_at = now + timedelta(seconds=self.lease)
+                claimed.append((msg.id, msg.kind, msg.payload, msg.attempts))
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def _deliver(self, message):
+        msg_id, kind, payload, attempts = message
+        error = None
+        try:
+            handler = self.handlers[kind]
+            handler(payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:500]
+
+        db = self.session_factory()
+        try:
+            msg = db.get(self.model, msg_id)
+            msg.attempts = attempts + 1
+            if error is None:
+                msg.status = SENT
+                msg.sent_at = datetime.now()
+                msg.last_error = None
+                self.sent += 1
+            elif msg.attempts >= self.max_attempts:
+                msg.status = DEAD
+                msg.last_error = error
+                self.dead += 1
+                print(f"💀 Outbox #{msg_id} ({kind}) abandonné : {error}", flush=True)
+            else:
+                msg.next_attempt_at = datetime.now() + timedelta(
+                    seconds=self.backoff(msg.attempts)
+                )
+                msg.last_error = error
+                self.retried += 1
+            db.commit()
+        finally:
+            db.close()
+
+    def run_once(self) -> int:
+        batch = self.claim()
+        # list() attend la fin de tous les envois du lot
+        list(self._executor.map(self._deliver, batch))
+        return len(batch)
+
+    def run_forever(self):
+        print("📮 Outbox worker démarré", flush=True)
+        while not self._stop.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                print(f"❌ Outbox worker: {e}", flush=True)
+                processed = 0
+            if processed < self.batch_size:
+                self._stop.wait(self.poll_interval)
+        self._executor.shutdown(wait=True)
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "retried": self.retried, "dead": self.dead}
@@ -0,0 +1,82 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+
+# ==============================================================================
+# PAGINATION PAR CURSEUR (KEYSET)
+# ==============================================================================
+# Le curseur est la valeur des colonnes de tri de la dernière ligne renvoyée,
+# encodée en base64 url-safe. La page suivante est un simple
+#   WHERE (col1, col2) > (v1, v2) ORDER BY col1, col2 LIMIT n
+# qui descend directement dans l'index, quelle que soit la profondeur.
+# Le curseur vient du client : chaque valeur est vérifiée contre le type de sa
+# colonne de tri (un curseur forgé donne un 400, pas une erreur SQL en 500).
+
+# Bornes d'un BIGINT : au-delà, le driver PostgreSQL lève une erreur
+INT_MIN, INT_MAX = -(2 ** 63), 2 ** 63 - 1
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+    return values
+
+
+def cursor_value(value, python_type, nullable=False):
+    """Valeur du curseur convertie / vérifiée pour ce type Python (400 sinon)."""
+    if value is None and nullable:
+        return None
+    if python_type is datetime:
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    elif not isinstance(value, bool):
+        if python_type is int and isinstance(value, int) and INT_MIN <= value <= INT_MAX:
+            return value
+        if python_type is float and isinstance(value, (int, float)):
+            return value
+        if python_type is str and isinstance(value, str):
+            return value
+    raise HTTPException(status_code=400, detail="Curseur invalide")
+
+
+def decode_keyset_cursor(cursor: str, columns) -> list:
+    """decode_cursor + une valeur du bon type par colonne de tri."""
+    values = decode_cursor(cursor, len(columns))
+    return [
+        cursor_value(value, col.type.python_type, col.expression.nullable)
+        for col, value in zip(columns, values)
+    ]
+
+
+def keyset_filter(columns, values, descending):
+    """Condition "après le curseur" pour un tri multi-colonnes.
+
+    `descending` est une liste de booléens (un par colonne). On développe la
+    comparaison de tuple en OR/AND pour supporter des sens de tri mixtes."""
+    clauses = []
+    for i, (col, value) in enumerate(zip(columns, values)):
+        equal_prefix = [c == v for c, v in zip(columns[:i], values[:i])]
+        step = col < value if descending[i] else col > value
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+def order_by_clauses(columns, descending):
+    return [c.desc() if d else c.asc() for c, d in zip(columns, descending)]
@@ -0,0 +1,301 @@
+import re
+from datetime import datetime
+
+from sqlalchemy import MetaData, column, delete, insert, inspect, select, table, text
+from sqlalchemy.schema import CreateTable
+
+from app.core.schema import add_column
+
+
+# ==============================================================================
+# TABLE D'ÉVÉNEMENTS DÉCOUPÉE PAR MOIS + RÉTENTION
+# ==============================================================================
+# - PostgreSQL : partitionnement natif `PARTITION BY RANGE (occurred_at)`, une
+#   partition par mois (<table>_YYYY_MM) créée à l'avance. Les requêtes sur la
+#   table parente ne lisent que les partitions utiles. Une partition DEFAULT
+#   (<table>_default) reçoit les lignes d'un mois pas encore créé (aucun
+#   déploiement depuis des mois) : l'insertion n'échoue jamais, et le
+#   prochain `ensure()` range ces lignes dans leur partition mensuelle.
+# - SQLite : pas de partitionnement. La table "chaude" ne garde que les mois
+#   récents ; `rotate()` déplace les mois plus anciens dans des tables
+#   <table>_YYYY_MM (INSERT ... SELECT + DELETE, un mois par transaction).
+# - Rétention : les mois trop vieux sont supprimés (DROP TABLE, instantané)
+#   ou archivés (détachés / renommés en <table>_archive_YYYY_MM, hors lecture).
+#   Un hook `before_drop` permet de compacter les données dans les rollups.
+
+
+def month_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1)
+
+
+def add_months(dt: datetime, n: int) -> datetime:
+    months = dt.year * 12 + dt.month - 1 + n
+    return datetime(months // 12, months % 12 + 1, 1)
+
+
+class MonthlyPartitions:
+    def __init__(self, table, column="occurred_at", premake=3):
+        self.table = table  # Table SQLAlchemy (modèle de la table chaude / parente)
+        self.column = column
+        self.premake = premake  # mois créés à l'avance (PostgreSQL)
+        self._name_re = re.compile(rf"^{re.escape(table.name)}_(\d{{4}})_(\d{{2}})$")
+        self.native = False
+
+    def name(self, start: datetime) -> str:
+        return f"{self.table.name}_{start.year:04d}_{start.month:02d}"
+
+    def default_name(self) -> str:
+        return f"{self.table.name}_default"
+
+    def archive_name(self, start: datetime) -> str:
+        return f"{self.table.name}_archive_{start.year:04d}_{start.month:02d}"
+
+    # --- Schéma ---
+
+    def ensure(self, engine, now=None):
+        """PostgreSQL : crée la table parente si besoin + les partitions à venir.
+        SQLite : ajoute aux tables mensuelles les colonnes apparues depuis.
+
+        À appeler avant create_all (sinon la table serait créée non partitionnée)."""
+        if engine.dialect.name != "postgresql":
+            self._sync_month_tables(engine)
+            return
+        with engine.begin() as conn:
+            if not inspect(conn).has_table(self.table.name):
+                conn.exec_driver_sql(self._parent_ddl(conn.dialect))
+                self._create_indexes(conn)
+            self.native = self._is_partitioned(conn)
+            if not self.native:
+                print(
+                    f"⚠️  {self.table.name} n'est pas partitionnée : "
+                    "lancer `python manage.py migrate-events`",
+                    flush=True,
+                )
+                return
+            self._create_default_partition(conn)
+            current = month_start(now or datetime.now())
+            months = {add_months(current, n) for n in range(-1, self.premake + 1)}
+            # Mois tombés dans la partition DEFAULT faute de partition dédiée
+            months.update(
+                conn.exec_driver_sql(
+                    f"SELECT DISTINCT date_trunc('month', {self.column}) FROM {self.default_name()}"
+                ).scalars()
+            )
+            for start in sorted(months):
+                self._create_partition(conn, start)
+
+    def detect(self, engine):
+        """Démarrage : lit si la table est partitionnée, sans rien créer."""
+        if engine.dialect.name != "postgresql":
+            return
+        with engine.connect() as conn:
+            self.native = self._is_partitioned(conn)
+
+    def _sync_month_tables(self, engine):
+        with engine.connect() as conn:
+            insp = inspect(conn)
+            missing = []
+            for name, _, _ in self.partitions(conn):
+                existing = {col["name"] for col in insp.get_columns(name)}
+                missing += [(name, c) for c in self.table.columns if c.name not in existing]
+        for name, c in missing:
+            add_column(engine, self._source(name), c)
+
+    def _parent_ddl(self, dialect, name=None) -> str:
+        columns = []
+        for c in self.table.columns:
+            if c.primary_key:
+                columns.append(f"{c.name} BIGSERIAL")
+            elif c.name == self.column:
+                columns.append(f"{c.name} TIMESTAMP WITHOUT TIME ZONE NOT NULL")
+            else:
+                columns.append(f"{c.name} {c.type.compile(dialect=dialect)}")
+        # La clé primaire d'une table partitionnée doit contenir la clé de partition
+        pk = [c.name for c in self.table.primary_key.columns] + [self.column]
+        return (
+            f"CREATE TABLE {name or self.table.name} ({', '.join(columns)}, "
+            f"PRIMARY KEY ({', '.join(pk)})) PARTITION BY RANGE ({self.column})"
+        )
+
+    def _create_indexes(self, conn):
+        # Index posés sur la parente : PostgreSQL les crée sur chaque partition
+        for index in self.table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+    def _is_partitioned(self, conn) -> bool:
+        return bool(
+            conn.execute(
+                text("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :name"),
+                {"name": self.table.name},
+            ).first()
+        )
+
+    def _create_default_partition(self, conn):
+        conn.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {self.default_name()} PARTITION OF {self.table.name} DEFAULT"
+        )
+
+    def _create_partition(self, conn, start):
+        name = self.name(start)
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+            return
+        end = add_months(start, 1)
+        in_month = f"{self.column} >= '{start:%Y-%m-%d}' AND {self.column} < '{end:%Y-%m-%d}'"
+        default = self.default_name()
+        has_default = conn.execute(text("SELECT to_regclass(:name)"), {"name": default}).scalar()
+        # PostgreSQL refuse de créer la partition si la DEFAULT contient déjà des
+        # lignes de ce mois : on les sort, puis on les réinsère via la parente
+        moved = 0
+        if has_default:
+            moved = conn.exec_driver_sql(
+                f"CREATE TEMP TABLE {name}_moved ON COMMIT DROP AS "
+                f"SELECT * FROM {default} WHERE {in_month}"
+            ).rowcount
+            if moved:
+                conn.exec_driver_sql(f"DELETE FROM {default} WHERE {in_month}")
+        conn.exec_driver_sql(
+            f"CREATE TABLE {name} PARTITION OF {self.table.name} "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+        if moved:
+            conn.exec_driver_sql(f"INSERT INTO {self.table.name} SELECT * FROM {name}_moved")
+            print(f"🗂️ {name} : {moved} événements sortis de {default}", flush=True)
+
+    def convert(self, engine, now=None) -> int:
+        """PostgreSQL : transforme la table existante en table partitionnée.
+
+        Les lignes sont recopiées (occurred_at manquant = created_at texte)."""
+        legacy = f"{self.table.name}_legacy"
+        names = [c.name for c in self.table.columns]
+        when = f"coalesce({self.column}, created_at::timestamp, now())"
+        with engine.begin() as conn:
+            if self._is_partitioned(conn):
+                return 0
+            conn.exec_driver_sql(f"ALTER TABLE {self.table.name} RENAME TO {legacy}")
+            # La séquence de l'id garde son nom : on la libère pour la nouvelle table
+            seq = conn.execute(
+                text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": legacy}
+            ).scalar()
+            if seq:
+                conn.exec_driver_sql(f"ALTER SEQUENCE {seq} RENAME TO {legacy}_id_seq")
+            # Les index et la clé primaire aussi : leurs noms servent à la nouvelle table
+            insp = inspect(conn)
+            pk_name = insp.get_pk_constraint(legacy).get("name")
+            if pk_name:
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {legacy} RENAME CONSTRAINT {pk_name} TO {pk_name}_legacy"
+                )
+            for ix in insp.get_indexes(legacy):
+                conn.exec_driver_sql(f"ALTER INDEX {ix['name']} RENAME TO {ix['name']}_legacy")
+            conn.exec_driver_sql(self._parent_ddl(conn.dialect))
+            self._create_indexes(conn)
+
+            first, last = conn.exec_driver_sql(f"SELECT min({when}), max({when}) FROM {legacy}").one()
+            current = month_start(now or datetime.now())
+            start = min(month_start(first), add_months(current, -1)) if first else add_months(current, -1)
+            stop = max(month_start(last), current) if last else current
+            while start <= add_months(stop, self.premake):
+                self._create_partition(conn, start)
+                start = add_months(start, 1)
+            self._create_default_partition(conn)
+
+            select_list = ", ".join(when if n == self.column else n for n in names)
+            moved = conn.exec_driver_sql(
+                f"INSERT INTO {self.table.name} ({', '.join(names)}) SELECT {select_list} FROM {legacy}"
+            ).rowcount
+            conn.exec_driver_sql(
+                f"SELECT setval(pg_get_serial_sequence('{self.table.name}', 'id'), "
+                f"coalesce((SELECT max(id) FROM {self.table.name}), 0) + 1, false)"
+            )
+            conn.exec_driver_sql(f"DROP TABLE {legacy}")
+        self.native = True
+        return moved
+
+    # --- Mois existants ---
+
+    def partitions(self, conn):
+        """[(nom, début, fin)] des tables / partitions mensuelles, de la plus ancienne à la plus récente."""
+        if conn.dialect.name == "postgresql":
+            names = conn.execute(
+                text(
+                    "SELECT c.relname FROM pg_inherits i "
+                    "JOIN pg_class c ON c.oid = i.inhrelid "
+                    "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :parent"
+                ),
+                {"parent": self.table.name},
+            ).scalars()
+        else:
+            names = inspect(conn).get_table_names()
+        found = []
+        for name in names:
+            m = self._name_re.match(name)
+            if m:
+                start = datetime(int(m.group(1)), int(m.group(2)), 1)
+                found.append((name, start, add_months(start, 1)))
+        return sorted(found, key=lambda p: p[1])
+
+    def sources(self, conn):
+        """Tables à lire pour parcourir tous les événements encore en base."""
+        if self.native:
+            return [self.table]
+        return [self.table] + [self._source(name) for name, _, _ in self.partitions(conn)]
+
+    # --- SQLite : la table chaude ne garde que les mois récents ---
+
+    def rotate(self, engine, hot_months=1, now=None) -> int:
+        if engine.dialect.name == "postgresql":
+            return 0
+        cutoff = add_months(month_start(now or datetime.now()), -hot_months)
+        col = self.table.c[self.column]
+        moved = 0
+        while True:
+            with engine.begin() as conn:
+                oldest = conn.execute(
+                    select(col).where(col < cutoff).order_by(col).limit(1)
+                ).scalar()
+                if oldest is None:
+                    return moved
+                start = month_start(oldest)
+                end = add_months(start, 1)
+                name = self.name(start)
+                if not inspect(conn).has_table(name):
+                    conn.execute(CreateTable(self.table.to_metadata(MetaData(), name=name)))
+                in_month = (col >= start) & (col < end)
+                conn.execute(
+                    insert(self._source(name)).from_select(
+                        [c.name for c in self.table.columns],
+                        select(*self.table.columns).where(in_month),
+                    )
+                )
+                moved += conn.execute(delete(self.table).where(in_month)).rowcount
+                print(f"🗂️ Événements de {start:%Y-%m} déplacés dans {name}", flush=True)
+
+    # --- Rétention ---
+
+    def expire(self, engine, keep_months, mode="drop", before_drop=None, now=None):
+        """Supprime (ou archive) les mois antérieurs aux `keep_months` derniers mois."""
+        if keep_months <= 0:
+            return []
+        cutoff = add_months(month_start(now or datetime.now()), -keep_months)
+        self.rotate(engine, hot_months=keep_months, now=now)
+        with engine.connect() as conn:
+            expired = [p for p in self.partitions(conn) if p[2] <= cutoff]
+
+        done = []
+        for name, start, end in expired:
+            if before_drop:
+                before_drop(self._source(name), start, end)
+            with engine.begin() as conn:
+                if engine.dialect.name == "postgresql":
+                    conn.exec_driver_sql(f"ALTER TABLE {self.table.name} DETACH PARTITION {name}")
+                if mode == "archive":
+                    conn.exec_driver_sql(f"ALTER TABLE {name} RENAME TO {self.archive_name(start)}")
+                else:
+                    conn.exec_driver_sql(f"DROP TABLE {name}")
+            print(f"🧹 {name} : {'archivée' if mode == 'archive' else 'supprimée'}", flush=True)
+            done.append(name)
+        return done
+
+    def _source(self, name):
+        return table(name, *[column(c.name, c.type) for c in self.table.columns])
+
@@ -0,0 +1,124 @@
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+# ==============================================================================
+# POOL DE CONNEXIONS : CONFIGURATION + MÉTRIQUES
+# ==============================================================================
+# - Le pool est une sous-classe de QueuePool qui chronomètre l'attente d'une
+#   connexion libre et compte les timeouts (pool saturé).
+# - Pre-ping configurable : "always" (un SELECT 1 à chaque checkout, défaut
+#   SQLAlchemy), "idle" (seulement si la connexion dormait depuis plus de
+#   `ping_idle` secondes) ou "never" (on s'appuie sur pool_recycle).
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidated = 0
+        self.pings = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.engine = None
+
+    def record_wait(self, ms, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total_ms += ms
+            self.wait_max_ms = max(self.wait_max_ms, ms)
+
+    def stats(self) -> dict:
+        pool = self.engine.pool if self.engine is not None else None
+        waits = self.checkouts + self.timeouts
+        data = {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connects": self.connects,
+            "invalidated": self.invalidated,
+            "pings": self.pings,
+            "wait_avg_ms": round(self.wait_total_ms / waits, 3) if waits else 0.0,
+            "wait_max_ms": round(self.wait_max_ms, 3),
+        }
+        if isinstance(pool, QueuePool):
+            data.update(
+                {
+                    "size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "checked_in": pool.checkedin(),
+                    "overflow": max(0, pool.overflow()),
+                    "max_overflow": pool._max_overflow,
+                }
+            )
+        return data
+
+
+def instrumented_pool_class(metrics: PoolMetrics, is_async=False):
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = base._do_get(self)
+        except exc.TimeoutError:
+            metrics.record_wait((time.perf_counter() - start) * 1000, timed_out=True)
+            raise
+        metrics.record_wait((time.perf_counter() - start) * 1000)
+        return conn
+
+    return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+def pool_options(size, max_overflow, timeout, recycle, pre_ping) -> dict:
+    return {
+        "pool_size": size,
+        "max_overflow": max_overflow,
+        "pool_timeout": timeout,
+        "pool_recycle": recycle,
+        "pool_pre_ping": pre_ping == "always",
+    }
+
+
+def instrument_engine(engine, metrics: PoolMetrics, pre_ping="always", ping_idle=30.0):
+    """Branche les événements du pool (accepte un moteur sync ou async)."""
+    # engine.dispose() recrée le pool (les listeners suivent) : on garde le moteur
+    metrics.engine = getattr(engine, "sync_engine", engine)
+    pool = metrics.engine.pool
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_conn, record):
+        metrics.connects += 1
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_conn, record, exception):
+        metrics.invalidated += 1
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_conn, record):
+        if dbapi_conn is not None:
+            record.info["checkin_at"] = time.monotonic()
+
+    if pre_ping != "idle":
+        return
+
+    @event.listens_for(pool, "checkout")
+    def _ping_if_idle(dbapi_conn, record, proxy):
+        idle_since = record.info.get("checkin_at")
+        if idle_since is None or time.monotonic() - idle_since < ping_idle:
+            return
+        metrics.pings += 1
+        try:
+            cursor = dbapi_conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+        except Exception:
+            # Le pool jette la connexion et en ouvre une nouvelle
+            raise exc.DisconnectionError()
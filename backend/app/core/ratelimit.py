@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+# ==============================================================================
+# LIMITEUR À FENÊTRE GLISSANTE (EN MÉMOIRE)
+# ==============================================================================
+# Une deque de timestamps par clé (ex: "user:bob", "ip:1.2.3.4"). Le nombre de
+# clés suivies est borné : les plus anciennes sont oubliées en premier.
+
+
+class SlidingWindowLimiter:
+    def __init__(self, max_hits, window, max_keys=10_000):
+        self.max_hits = max_hits
+        self.window = window
+        self.max_keys = max_keys
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _prune(self, key, now):
+        hits = self._hits.get(key)
+        if hits is None:
+            return None
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+        return hits
+
+    def retry_after(self, key) -> float:
+        """0 si la clé peut continuer, sinon le nombre de secondes à attendre."""
+        now = time.monotonic()
+        with self._lock:
+            hits = self._prune(key, now)
+            if not hits or len(hits) < self.max_hits:
+                return 0.0
+            self.rejected += 1
+            return max(0.0, hits[0] + self.window - now)
+
+    def hit(self, key):
+        now = time.monotonic()
+        with self._lock:
+            hits = self._prune(key, now)
+            if hits is None:
+                hits = self._hits[key] = deque()
+            hits.append(now)
+            self._hits.move_to_end(key)
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "tracked_keys": len(self._hits),
+            "max_hits": self.max_hits,
+            "window_s": self.window,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,180 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert as generic_insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+# ==============================================================================
+# COMPTEURS PRÉ-AGRÉGÉS (UPSERT "+= delta")
+# ==============================================================================
+# Les tables de rollup ont une clé composite (ex: jour + type d'événement) et
+# des colonnes compteurs. On incrémente en une seule requête :
+#   INSERT ... VALUES (...), (...) ON CONFLICT (clé) DO UPDATE SET n = n + excluded.n
+# (supporté par PostgreSQL et SQLite >= 3.24).
+# Tables passées en paramètre, comme dans app/core/backfill.py.
+
+
+def dialect_insert(db, table):
+    """INSERT avec support ON CONFLICT (PostgreSQL / SQLite), sinon None.
+
+    `db` : session ou connexion."""
+    bind = db if hasattr(db, "dialect") else db.get_bind()
+    name = bind.dialect.name
+    if name == "postgresql":
+        return postgresql.insert(table)
+    if name == "sqlite":
+        return sqlite.insert(table)
+    return None
+
+
+def upsert_increments(db, table, key_columns, rows):
+    """Ajoute les compteurs de `rows` (liste de dicts clé + deltas) à `table`.
+
+    Les lignes doivent déjà être agrégées (une seule ligne par clé)."""
+    if not rows:
+        return
+
+    counter_columns = [c for c in rows[0] if c not in key_columns]
+    stmt = dialect_insert(db, table)
+
+    if stmt is not None:
+        stmt = stmt.values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[k] for k in key_columns],
+            set_={c: table.c[c] + stmt.excluded[c] for c in counter_columns},
+        )
+        db.execute(stmt)
+        return
+
+    # Autres bases : UPDATE puis INSERT si la ligne n'existe pas encore
+    for row in rows:
+        where = [table.c[k] == row[k] for k in key_columns]
+        res = db.execute(
+            table.update()
+            .where(*where)
+            .values({c: table.c[c] + row[c] for c in counter_columns})
+        )
+        if res.rowcount == 0:
+            db.execute(generic_insert(table).values(row))
+
+
+def aggregate(rows, key_func, counter_func):
+    """Regroupe des lignes brutes en {clé: {compteur: total}}."""
+    acc = {}
+    for row in rows:
+        key = key_func(row)
+        if key is None:
+            continue
+        totals = acc.setdefault(key, {})
+        for name, value in counter_func(row).items():
+            totals[name] = totals.get(name, 0) + value
+    return acc
+
+
+# --- Rollups analytics (jour x type d'événement, jour x produit vu, ventes par jour) ---
+
+def event_day(row) -> str:
+    # occurred_at (datetime) ; les anciennes lignes n'ont que created_at (texte ISO)
+    when = row.get("occurred_at") or row.get("created_at")
+    if isinstance(when, datetime):
+        return when.strftime("%Y-%m-%d")
+    return str(when or "")[:10]
+
+
+def product_view_name(row):
+    if row["event_type"] != "view_item":
+        return None
+    if row.get("product_name"):
+        return row["product_name"]
+    # Anciennes lignes : nom seulement dans metadata_json
+    if not row.get("metadata_json"):
+        return None
+    try:
+        return json.loads(row["metadata_json"]).get("name", "Inconnu")
+    except (ValueError, AttributeError):
+        return None
+
+
+def add_event_rollups(db, rows, daily_events, product_views):
+    """Incrémente les rollups pour un lot d'événements (dicts), dans la transaction de `db`."""
+    per_type = aggregate(
+        rows,
+        lambda r: (event_day(r), r["event_type"]),
+        lambda r: {"count": 1},
+    )
+    upsert_increments(
+        db,
+        daily_events,
+        ["day", "event_type"],
+        [{"day": d, "event_type": t, **c} for (d, t), c in per_type.items()],
+    )
+
+    def product_key(r):
+        name = product_view_name(r)
+        return (event_day(r), name) if name else None
+
+    per_product = aggregate(rows, product_key, lambda r: {"views": 1})
+    upsert_increments(
+        db,
+        product_views,
+        ["day", "product_name"],
+        [{"day": d, "product_name": n, **c} for (d, n), c in per_product.items()],
+    )
+
+
+def stream_events(db, source, where=None, chunk_size=10_000):
+    """Événements bruts d'une table (chaude ou mensuelle), en dicts, par paquets."""
+    stmt = select(
+        source.c.event_type,
+        source.c.metadata_json,
+        source.c.product_name,
+        source.c.occurred_at,
+        source.c.created_at,
+    )
+    if where is not None:
+        stmt = stmt.where(where)
+    for ev in db.execute(stmt.execution_options(yield_per=chunk_size)).mappings():
+        yield dict(ev)
+
+
+def rebuild_rollups(db, sources, orders, daily_events, daily_sales, product_views, chunk_size=10_000):
+    """Recalcule les rollups depuis les tables brutes (backfill). Commit à la charge de l'appelant.
+
+    Les jours dont les événements bruts ont été supprimés par la rétention
+    sont gardés tels quels : les rollups sont alors la seule trace."""
+    oldest = None
+    for source in sources:
+        firsts = db.execute(
+            select(func.min(source.c.occurred_at), func.min(source.c.created_at))
+        ).one()
+        for first in filter(None, firsts):
+            day = event_day({"occurred_at": first})
+            oldest = day if oldest is None else min(oldest, day)
+    if oldest is not None:
+        db.execute(delete(daily_events).where(daily_events.c.day >= oldest))
+        db.execute(delete(product_views).where(product_views.c.day >= oldest))
+    db.execute(delete(daily_sales))
+
+    batch = []
+    for source in sources:
+        for row in stream_events(db, source, chunk_size=chunk_size):
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                add_event_rollups(db, batch, daily_events, product_views)
+                batch = []
+    add_event_rollups(db, batch, daily_events, product_views)
+
+    per_day = aggregate(
+        db.execute(
+            select(orders.c.created_at, orders.c.total_amount).execution_options(yield_per=chunk_size)
+        ),
+        lambda o: str(o.created_at or "")[:10],
+        lambda o: {"orders": 1, "revenue": o.total_amount or 0.0},
+    )
+    upsert_increments(
+        db,
+        daily_sales,
+        ["day"],
+        [{"day": d, **c} for d, c in per_day.items()],
+    )
@@ -0,0 +1,44 @@
+from sqlalchemy import inspect
+
+
+# ==============================================================================
+# SYNCHRONISATION DU SCHÉMA AU DÉMARRAGE
+# ==============================================================================
+# create_all() crée les tables manquantes mais ignore les colonnes et index
+# ajoutés ensuite sur une table qui existe déjà. On les crée ici un par un.
+# Les nouvelles colonnes doivent être nullables ou avoir un server_default.
+
+
+def add_column(engine, table, column):
+    col_type = column.type.compile(dialect=engine.dialect)
+    ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"
+    if column.server_default is not None:
+        default = column.server_default.arg
+        default = f"'{default}'" if isinstance(default, str) else str(default)
+        ddl += f" DEFAULT {default}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+    with engine.begin() as conn:
+        conn.exec_driver_sql(ddl)
+
+
+def sync_schema(engine, metadata, skip_indexes=()):
+    """Crée tables, colonnes et index manquants. Une erreur (ex : index unique
+    impossible à cause de doublons) remonte : la migration n'est pas notée
+    comme appliquée. `skip_indexes` : index laissés à une migration ultérieure
+    sur une table existante."""
+    metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                add_column(engine, table, column)
+        existing_indexes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes and index.name not in skip_indexes:
+                index.create(bind=engine, checkfirst=True)
@@ -0,0 +1,188 @@
+import re
+
+from sqlalchemy import text
+
+
+# ==============================================================================
+# RECHERCHE PLEIN TEXTE DU CATALOGUE (nom, catégorie, description)
+# ==============================================================================
+# - SQLite   : table virtuelle FTS5 `products_fts` (rowid = id produit),
+#              classement bm25, tenue à jour par les routes d'écriture.
+# - Postgres : colonne générée `products.search_vector` (tsvector pondéré
+#              nom > catégorie > description) + index GIN, classement ts_rank.
+#              Postgres la recalcule lui-même à chaque INSERT / UPDATE.
+# - Sinon    : repli sur LIKE (pas de classement).
+# Chaque mot de la requête est cherché en préfixe ("gol" trouve "Gold") et
+# tous les mots doivent être présents.
+
+MAX_TERMS = 8
+
+# Poids des colonnes (nom, catégorie, description)
+BM25_WEIGHTS = (10.0, 4.0, 1.0)
+
+
+def search_terms(query: str):
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+class ProductSearchIndex:
+    def __init__(self, ts_config="simple"):
+        if not re.fullmatch(r"\w+", ts_config):
+            raise ValueError(f"Configuration text search invalide : {ts_config!r}")
+        self.ts_config = ts_config
+        self.backend = None
+
+    def ensure(self, engine):
+        """Crée l'index s'il manque (et le remplit la première fois)."""
+        name = engine.dialect.name
+        if name == "postgresql":
+            self._ensure_postgres(engine)
+        elif name == "sqlite":
+            self._ensure_sqlite(engine)
+        else:
+            self.backend = "like"
+        print(f"🔎 Recherche produits : {self.backend}", flush=True)
+
+    def detect(self, engine):
+        """Démarrage : choisit le backend d'après l'index existant, sans rien créer."""
+        name = engine.dialect.name
+        with engine.connect() as conn:
+            if name == "sqlite":
+                found = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'products_fts'"
+                ).first()
+                self.backend = "fts5" if found else "like"
+            elif name == "postgresql":
+                found = conn.exec_driver_sql(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'products' AND column_name = 'search_vector'"
+                ).first()
+                self.backend = "tsvector" if found else "like"
+            else:
+                self.backend = "like"
+        print(f"🔎 Recherche produits : {self.backend}", flush=True)
+
+    def _ensure_sqlite(self, engine):
+        with engine.begin() as conn:
+            exists = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE name = 'products_fts'"
+            ).first()
+            if not exists:
+                try:
+                    conn.exec_driver_sql(
+                        "CREATE VIRTUAL TABLE products_fts USING fts5("
+                        "name, category, description, "
+                        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+                    )
+                except Exception as e:
+                    # SQLite compilé sans FTS5
+                    print(f"⚠️  FTS5 indisponible ({e}), repli sur LIKE", flush=True)
+                    self.backend = "like"
+                    return
+        self.backend = "fts5"
+        if not exists:
+            with engine.begin() as conn:
+                self.rebuild(conn)
+
+    def _ensure_postgres(self, engine):
+        cfg = self.ts_config
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                "GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('{cfg}', coalesce(name, '')), 'A') || "
+                f"setweight(to_tsvector('{cfg}', coalesce(category, '')), 'B') || "
+                f"setweight(to_tsvector('{cfg}', coalesce(description, '')), 'C')"
+                ") STORED"
+            )
+            conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_products_search "
+                "ON products USING GIN (search_vector)"
+            )
+        self.backend = "tsvector"
+
+    # --- Maintenance (dans la transaction de la route d'écriture) ---
+
+    def index_product(self, db, product):
+        if self.backend != "fts5":
+            return
+        self.remove(db, product.id)
+        db.execute(
+            text(
+                "INSERT INTO products_fts (rowid, name, category, description) "
+                "VALUES (:id, :name, :category, :description)"
+            ),
+            {
+                "id": product.id,
+                "name": product.name or "",
+                "category": product.category or "",
+                "description": product.description or "",
+            },
+        )
+
+    def remove(self, db, product_id):
+        if self.backend != "fts5":
+            return
+        db.execute(text("DELETE FROM products_fts WHERE rowid = :id"), {"id": product_id})
+
+    def rebuild(self, db) -> int:
+        """Réindexe tout le catalogue (session ou connexion sync)."""
+        if self.backend != "fts5":
+            return 0
+        db.execute(text("DELETE FROM products_fts"))
+        res = db.execute(
+            text(
+                "INSERT INTO products_fts (rowid, name, category, description) "
+                "SELECT id, coalesce(name, ''), coalesce(category, ''), "
+                "coalesce(description, '') FROM products"
+            )
+        )
+        return res.rowcount
+
+    # --- Requête ---
+
+    async def search(self, db, query, limit, offset=0, category=None):
+        """Ids des produits trouvés, du plus pertinent au moins pertinent."""
+        terms = search_terms(query)
+        if not terms:
+            return []
+        params = {"limit": limit, "offset": offset, "category": category}
+
+        if self.backend == "fts5":
+            params["match"] = " ".join(f'"{t}"*' for t in terms)
+            w_name, w_category, w_description = BM25_WEIGHTS
+            sql = (
+                "SELECT f.rowid FROM products_fts f "
+                + ("JOIN products p ON p.id = f.rowid " if category else "")
+                + "WHERE products_fts MATCH :match "
+                + ("AND p.category = :category " if category else "")
+                + f"ORDER BY bm25(products_fts, {w_name}, {w_category}, {w_description}), f.rowid "
+                "LIMIT :limit OFFSET :offset"
+            )
+        elif self.backend == "tsvector":
+            params["tsquery"] = " & ".join(f"{t}:*" for t in terms)
+            tsquery = f"to_tsquery('{self.ts_config}', :tsquery)"
+            sql = (
+                "SELECT id FROM products "
+                f"WHERE search_vector @@ {tsquery} "
+                + ("AND category = :category " if category else "")
+                + f"ORDER BY ts_rank(search_vector, {tsquery}) DESC, id "
+                "LIMIT :limit OFFSET :offset"
+            )
+        else:
+            where = []
+            for n, t in enumerate(terms):
+                params[f"t{n}"] = f"%{t}%"
+                where.append(
+                    f"(lower(name) LIKE :t{n} OR lower(category) LIKE :t{n} "
+                    f"OR lower(coalesce(description, '')) LIKE :t{n})"
+                )
+            if category:
+                where.append("category = :category")
+            sql = (
+                f"SELECT id FROM products WHERE {' AND '.join(where)} "
+                "ORDER BY id DESC LIMIT :limit OFFSET :offset"
+            )
+
+        rows = await db.execute(text(sql), params)
+        return [row[0] for row in rows]
@@ -0,0 +1,32 @@
+import json
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle : repli sur json (plus lent)
+    orjson = None
+
+
+# ==============================================================================
+# SÉRIALISATION JSON RAPIDE (listes du catalogue et des avis)
+# ==============================================================================
+# Chemin normal de FastAPI : objets ORM -> validation response_model (un modèle
+# Pydantic par ligne) -> jsonable_encoder -> json.dumps. Pour les grosses
+# listes c'est l'essentiel du CPU de la requête.
+# Chemin rapide : colonnes lues en tuples -> dicts -> bytes (orjson), et les
+# bytes sont mis en cache par version du catalogue : une réponse déjà servie
+# ne coûte plus qu'une copie.
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class RawJSONResponse(Response):
+    """Réponse dont le corps est déjà du JSON encodé (bytes) : rien à valider ni à sérialiser."""
+    media_type = "application/json"
@@ -0,0 +1,2 @@
+# Migrations du schéma, appliquées par `python manage.py migrate`.
+# Nommage : v<VERSION sur 4 chiffres>_<sujet>.py (voir app/core/migrations.py).
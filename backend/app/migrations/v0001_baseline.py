@@ -0,0 +1,161 @@
+from sqlalchemy import JSON, Column, DateTime, Float, ForeignKey, Index, Integer, MetaData, String, Table
+
+VERSION = 1
+DESCRIPTION = "Schéma de base (tables, colonnes et index des modèles)"
+
+# Copie figée du schéma à la version 1 : une migration ne lit jamais les
+# modèles courants (qui évolueront). Les migrations suivantes réutilisent ces
+# tables quand elles travaillent sur des colonnes déjà présentes ici.
+metadata = MetaData()
+
+admins = Table(
+    "admins",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String, unique=True, index=True),
+    Column("hashed_password", String),
+)
+
+products = Table(
+    "products",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, index=True),
+    Column("price", Float),
+    Column("category", String),
+    Column("image_url", String),
+    Column("description", String, nullable=True),
+    Column("rating_count", Integer, server_default="0", nullable=False),
+    Column("rating_sum", Integer, server_default="0", nullable=False),
+    Column("rating_1", Integer, server_default="0", nullable=False),
+    Column("rating_2", Integer, server_default="0", nullable=False),
+    Column("rating_3", Integer, server_default="0", nullable=False),
+    Column("rating_4", Integer, server_default="0", nullable=False),
+    Column("rating_5", Integer, server_default="0", nullable=False),
+    Index("ix_products_category_id", "category", "id"),
+    Index("ix_products_category_price_id", "category", "price", "id"),
+    Index("ix_products_price_id", "price", "id"),
+)
+
+reviews = Table(
+    "reviews",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("product_id", Integer, ForeignKey("products.id")),
+    Column("author", String),
+    Column("rating", Integer),
+    Column("comment", String),
+    Column("created_at", String),
+    Index("ix_reviews_product_created_id", "product_id", "created_at", "id"),
+)
+
+orders = Table(
+    "orders",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("stripe_id", String, index=True),
+    Column("customer_email", String),
+    Column("customer_name", String, nullable=True),
+    Column("total_amount", Float),
+    Column("status", String),
+    Column("created_at", String),
+    Column("items_json", String, nullable=True),
+    Column("shipping_address_json", String, nullable=True),
+    Column("placed_at", DateTime, index=True, nullable=True),
+    Column("shipping_address", JSON, nullable=True),
+    Index("uq_orders_stripe_id", "stripe_id", unique=True),
+    Index("ix_orders_placed_id", "placed_at", "id"),
+    Index("ix_orders_status_placed_id", "status", "placed_at", "id"),
+    Index("ix_orders_email_placed_id", "customer_email", "placed_at", "id"),
+)
+
+order_lines = Table(
+    "order_lines",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("order_id", Integer, ForeignKey("orders.id"), nullable=False, index=True),
+    Column("product_id", Integer, nullable=True),
+    Column("name", String),
+    Column("unit_price", Float, nullable=True),
+    Column("quantity", Integer, nullable=False),
+    Index("ix_order_lines_product_order", "product_id", "order_id"),
+)
+
+analytics_events = Table(
+    "analytics_events",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("event_type", String, index=True),
+    Column("user_id", String, index=True),
+    Column("page_url", String),
+    Column("metadata_json", String),
+    Column("created_at", String, nullable=True),
+    Column("occurred_at", DateTime, index=True),
+    Column("product_id", Integer, nullable=True),
+    Column("product_name", String, nullable=True),
+    Index("ix_analytics_events_product_occurred", "product_id", "occurred_at"),
+)
+
+analytics_daily_events = Table(
+    "analytics_daily_events",
+    metadata,
+    Column("day", String(10), primary_key=True),
+    Column("event_type", String, primary_key=True),
+    Column("count", Integer, nullable=False),
+)
+
+sales_daily = Table(
+    "sales_daily",
+    metadata,
+    Column("day", String(10), primary_key=True),
+    Column("orders", Integer, nullable=False),
+    Column("revenue", Float, nullable=False),
+)
+
+product_views_daily = Table(
+    "product_views_daily",
+    metadata,
+    Column("day", String(10), primary_key=True),
+    Column("product_name", String, primary_key=True),
+    Column("views", Integer, nullable=False),
+)
+
+stripe_events = Table(
+    "stripe_events",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("event_id", String, unique=True, nullable=False),
+    Column("event_type", String),
+    Column("payload", String, nullable=False),
+    Column("status", String, nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("last_error", String, nullable=True),
+    Column("received_at", DateTime),
+    Column("processed_at", DateTime, nullable=True),
+    Index("ix_stripe_events_status_id", "status", "id"),
+)
+
+outbox = Table(
+    "outbox",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("kind", String, nullable=False),
+    Column("payload", JSON, nullable=False),
+    Column("status", String, nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("next_attempt_at", DateTime, nullable=False),
+    Column("last_error", String, nullable=True),
+    Column("created_at", DateTime),
+    Column("sent_at", DateTime, nullable=True),
+    Index("ix_outbox_status_next_attempt", "status", "next_attempt_at"),
+)
+
+
+def upgrade(engine):
+    from app.core.partitions import MonthlyPartitions
+    from app.core.schema import sync_schema
+
+    # Avant create_all : sur PostgreSQL analytics_events doit naître partitionnée
+    MonthlyPartitions(analytics_events, "occurred_at").ensure(engine)
+    # Index unique des commandes : créé par la migration 5, après dédoublonnage
+    sync_schema(engine, metadata, skip_indexes={"uq_orders_stripe_id"})
@@ -0,0 +1,10 @@
+import os
+
+VERSION = 2
+DESCRIPTION = "Index plein texte des produits (FTS5 / tsvector)"
+
+
+def upgrade(engine):
+    from app.core.search import ProductSearchIndex
+
+    ProductSearchIndex(os.getenv("SEARCH_TS_CONFIG", "simple")).ensure(engine)
@@ -0,0 +1,9 @@
+VERSION = 3
+DESCRIPTION = "Commandes : anciennes colonnes JSON -> order_lines / placed_at"
+
+
+def upgrade(engine):
+    from app.core.backfill import migrate_legacy_orders
+    from app.migrations.v0001_baseline import order_lines, orders, products
+
+    migrate_legacy_orders(engine, orders, order_lines, products)
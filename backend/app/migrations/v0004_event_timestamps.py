@@ -0,0 +1,14 @@
+VERSION = 4
+DESCRIPTION = "analytics_events : occurred_at rempli (SQLite) / partitionnée par mois (PostgreSQL)"
+
+
+def upgrade(engine):
+    from app.core.backfill import backfill_event_timestamps
+    from app.core.partitions import MonthlyPartitions
+    from app.migrations.v0001_baseline import analytics_events
+
+    if engine.dialect.name == "postgresql":
+        # convert() recrée aussi les index de la table sur la nouvelle parente
+        MonthlyPartitions(analytics_events, "occurred_at").convert(engine)
+        return
+    backfill_event_timestamps(engine, analytics_events)
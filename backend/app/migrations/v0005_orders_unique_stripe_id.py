@@ -0,0 +1,21 @@
+VERSION = 5
+DESCRIPTION = "Commandes : suppression des doublons de stripe_id + index unique (idempotence du webhook)"
+
+# SQL figé : ne dépend pas des modèles courants. On garde la plus ancienne
+# commande de chaque session Stripe ; les lignes des doublons partent avec eux.
+DUPLICATES = (
+    "SELECT id FROM orders WHERE stripe_id IS NOT NULL AND id NOT IN "
+    "(SELECT min(id) FROM orders WHERE stripe_id IS NOT NULL GROUP BY stripe_id)"
+)
+
+
+def upgrade(engine):
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DELETE FROM order_lines WHERE order_id IN ({DUPLICATES})")
+        removed = conn.exec_driver_sql(f"DELETE FROM orders WHERE id IN ({DUPLICATES})").rowcount
+        # Sans cet index, INSERT ... ON CONFLICT (stripe_id) du webhook échoue
+        conn.exec_driver_sql(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_orders_stripe_id ON orders (stripe_id)"
+        )
+    if removed:
+        print(f"🧹 {removed} commandes en double supprimées", flush=True)
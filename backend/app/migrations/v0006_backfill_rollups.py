@@ -0,0 +1,26 @@
+VERSION = 6
+DESCRIPTION = "Rollups quotidiens (événements, ventes, vues produit) recalculés depuis les tables brutes"
+
+
+def upgrade(engine):
+    from app.core.partitions import MonthlyPartitions
+    from app.core.rollups import rebuild_rollups
+    from app.migrations.v0001_baseline import (
+        analytics_daily_events,
+        analytics_events,
+        orders,
+        product_views_daily,
+        sales_daily,
+    )
+
+    partitions = MonthlyPartitions(analytics_events, "occurred_at")
+    partitions.detect(engine)
+    with engine.begin() as conn:
+        rebuild_rollups(
+            conn,
+            partitions.sources(conn),
+            orders,
+            analytics_daily_events,
+            sales_daily,
+            product_views_daily,
+        )
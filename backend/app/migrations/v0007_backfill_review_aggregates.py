@@ -0,0 +1,9 @@
+VERSION = 7
+DESCRIPTION = "Produits : note moyenne / histogramme recalculés depuis les avis"
+
+
+def upgrade(engine):
+    from app.core.backfill import rebuild_review_aggregates
+    from app.migrations.v0001_baseline import products, reviews
+
+    rebuild_review_aggregates(engine, products, reviews)
@@ -0,0 +1,23 @@
+from app.models.base import Base
+from app.models.admin import AdminUser
+from app.models.analytics import DailyEventStat, DailyProductView, DailySalesStat, EventModel
+from app.models.catalog import ProductModel, ReviewModel
+from app.models.messaging import OutboxMessage, StripeEventModel
+from app.models.orders import OrderLineModel, OrderModel
+from app.models.schema_version import SchemaVersion
+
+__all__ = [
+    "Base",
+    "AdminUser",
+    "DailyEventStat",
+    "DailyProductView",
+    "DailySalesStat",
+    "EventModel",
+    "OrderLineModel",
+    "OrderModel",
+    "OutboxMessage",
+    "ProductModel",
+    "ReviewModel",
+    "SchemaVersion",
+    "StripeEventModel",
+]
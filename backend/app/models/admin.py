@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, String
+
+from app.models.base import Base
+
+
+class AdminUser(Base):
+    __tablename__ = "admins"
+    id = Column(Integer, primary_key=True, index=True)
+    username = Column(String, unique=True, index=True)
+    hashed_password = Column(String)
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, Index, Integer, String
+
+from app.models.base import Base
+
+
+class EventModel(Base):
+    __tablename__ = "analytics_events"
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String, index=True)
+    user_id = Column(String, index=True)
+    page_url = Column(String)
+    metadata_json = Column(String)
+    created_at = Column(String, nullable=True)  # ancien format texte, plus écrit
+    # Clé de partitionnement (PostgreSQL) / de rotation mensuelle (SQLite)
+    occurred_at = Column(DateTime, default=datetime.now, index=True)
+    # Extraits de metadata_json à l'ingestion (plus de JSON à parser en lecture)
+    product_id = Column(Integer, nullable=True)
+    product_name = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_analytics_events_product_occurred", "product_id", "occurred_at"),
+    )
+
+
+# --- Rollups quotidiens (maintenus à l'écriture, lus par le dashboard) ---
+
+class DailyEventStat(Base):
+    __tablename__ = "analytics_daily_events"
+    day = Column(String(10), primary_key=True)  # YYYY-MM-DD
+    event_type = Column(String, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+
+class DailySalesStat(Base):
+    __tablename__ = "sales_daily"
+    day = Column(String(10), primary_key=True)
+    orders = Column(Integer, default=0, nullable=False)
+    revenue = Column(Float, default=0.0, nullable=False)
+
+
+class DailyProductView(Base):
+    __tablename__ = "product_views_daily"
+    day = Column(String(10), primary_key=True)
+    product_name = Column(String, primary_key=True)
+    views = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,6 @@
+from sqlalchemy.orm import declarative_base
+
+
+# Base unique de tous les modèles : main.py, manage.py et les migrations
+# importent les tables depuis `app.models`.
+Base = declarative_base()
@@ -0,0 +1,64 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import relationship
+
+from app.models.base import Base
+
+
+class ProductModel(Base):
+    __tablename__ = "products"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, index=True)
+    price = Column(Float)
+    category = Column(String)
+    image_url = Column(String)
+    description = Column(String, nullable=True)
+
+    # Agrégats des avis (dénormalisés, mis à jour à chaque create_review)
+    rating_count = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_sum = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_1 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_2 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_3 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_4 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_5 = Column(Integer, default=0, server_default="0", nullable=False)
+
+    # Relation vers les avis
+    reviews = relationship(
+        "ReviewModel", back_populates="product", cascade="all, delete-orphan"
+    )
+
+    # Index composites pour la pagination keyset (filtres + tris du catalogue)
+    __table_args__ = (
+        Index("ix_products_category_id", "category", "id"),
+        Index("ix_products_category_price_id", "category", "price", "id"),
+        Index("ix_products_price_id", "price", "id"),
+    )
+
+    @property
+    def rating_average(self):
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 2)
+
+    @property
+    def rating_histogram(self):
+        return {str(n): getattr(self, f"rating_{n}") or 0 for n in range(1, 6)}
+
+
+class ReviewModel(Base):
+    __tablename__ = "reviews"
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"))
+    author = Column(String)
+    rating = Column(Integer)
+    comment = Column(String)
+    created_at = Column(String, default=lambda: datetime.now().isoformat())
+
+    product = relationship("ProductModel", back_populates="reviews")
+
+    # Listing paginé des avis d'un produit (plus récents d'abord)
+    __table_args__ = (
+        Index("ix_reviews_product_created_id", "product_id", "created_at", "id"),
+    )
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String
+
+from app.core.inbox import PENDING as INBOX_PENDING
+from app.core.outbox import PENDING
+from app.models.base import Base
+
+
+class StripeEventModel(Base):
+    __tablename__ = "stripe_events"
+    id = Column(Integer, primary_key=True)  # ordre d'arrivée
+    event_id = Column(String, unique=True, nullable=False)
+    event_type = Column(String)
+    payload = Column(String, nullable=False)  # corps brut reçu de Stripe
+    status = Column(String, default=INBOX_PENDING, nullable=False)  # pending | processed | failed
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String, nullable=True)
+    received_at = Column(DateTime, default=datetime.now)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_stripe_events_status_id", "status", "id"),)
+
+
+class OutboxMessage(Base):
+    __tablename__ = "outbox"
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, default=PENDING, nullable=False)  # pending | sent | dead
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.now, nullable=False)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    sent_at = Column(DateTime, nullable=True)
+
+    # Le worker cherche les messages dus : WHERE status = 'pending' AND next_attempt_at <= now
+    __table_args__ = (Index("ix_outbox_status_next_attempt", "status", "next_attempt_at"),)
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, Column, DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import relationship
+
+from app.models.base import Base
+
+
+class OrderModel(Base):
+    __tablename__ = "orders"
+    id = Column(Integer, primary_key=True, index=True)
+    stripe_id = Column(String, index=True) # Ajout index pour perf
+    customer_email = Column(String)
+    customer_name = Column(String, nullable=True)
+    total_amount = Column(Float)
+    status = Column(String)
+    created_at = Column(String, default=lambda: datetime.now().isoformat())
+    # Anciennes colonnes JSON-en-texte : plus écrites, conservées pour la migration
+    items_json = Column(String, nullable=True)
+    shipping_address_json = Column(String, nullable=True)
+
+    # Colonnes typées (remplies par le webhook, ou par `manage.py migrate-orders`)
+    placed_at = Column(DateTime, index=True, nullable=True)
+    shipping_address = Column(JSON, nullable=True)
+    lines = relationship(
+        "OrderLineModel",
+        back_populates="order",
+        cascade="all, delete-orphan",
+        order_by="OrderLineModel.id",
+    )
+
+    # Listing admin : pagination keyset (placed_at, id) + filtres
+    __table_args__ = (
+        # Une commande par session Stripe (idempotence du webhook)
+        Index("uq_orders_stripe_id", "stripe_id", unique=True),
+        Index("ix_orders_placed_id", "placed_at", "id"),
+        Index("ix_orders_status_placed_id", "status", "placed_at", "id"),
+        Index("ix_orders_email_placed_id", "customer_email", "placed_at", "id"),
+    )
+
+
+class OrderLineModel(Base):
+    __tablename__ = "order_lines"
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    product_id = Column(Integer, nullable=True)  # pas de FK : le produit peut être supprimé
+    name = Column(String)
+    unit_price = Column(Float, nullable=True)
+    quantity = Column(Integer, default=1, nullable=False)
+
+    order = relationship("OrderModel", back_populates="lines")
+
+    # Rapports de ventes par produit
+    __table_args__ = (Index("ix_order_lines_product_order", "product_id", "order_id"),)
@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, Integer, String
+
+from app.models.base import Base
+
+
+class SchemaVersion(Base):
+    """Une ligne par migration appliquée (voir app/core/migrations.py)."""
+    __tablename__ = "schema_version"
+    version = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.now, nullable=False)
+    duration_ms = Column(Float, nullable=True)
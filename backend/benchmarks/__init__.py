@@ -0,0 +1,2 @@
+# Benchmarks des routes chaudes de l'API : `python -m benchmarks.run --help`
+# (depuis backend/). Voir benchmarks/run.py.
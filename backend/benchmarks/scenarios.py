@@ -0,0 +1,96 @@
+import hashlib
+import hmac
+import itertools
+import json
+import time
+
+from benchmarks.seed import CATEGORIES
+
+
+# ==============================================================================
+# SCÉNARIOS : une requête HTTP par appel, tirée au hasard (graine fixe)
+# ==============================================================================
+# Chaque scénario est une fonction (rng, ctx) -> (méthode, url, options httpx)
+# + les codes de réponse attendus. `ctx` contient le token admin, le secret
+# du webhook et un compteur pour des sessions Stripe toujours nouvelles.
+
+WEBHOOK_SECRET = "whsec_benchmark"
+
+
+def stripe_signature(payload: bytes, secret=WEBHOOK_SECRET) -> str:
+    """En-tête Stripe-Signature valide pour `payload` (même schéma que Stripe)."""
+    ts = int(time.time())
+    mac = hmac.new(secret.encode(), f"{ts}.".encode() + payload, hashlib.sha256).hexdigest()
+    return f"t={ts},v1={mac}"
+
+
+def get_products(rng, ctx):
+    params = {"limit": 24, "sort": rng.choice(["newest", "price_asc", "price_desc"])}
+    if rng.random() < 0.6:
+        params["category"] = rng.choice(CATEGORIES)
+    return "GET", "/api/v1/products", {"params": params}
+
+
+def track(rng, ctx):
+    product_id = rng.randrange(1, ctx["products"] + 1)
+    body = {
+        "event_type": rng.choice(["page_view", "view_item", "add_to_cart"]),
+        "user_id": f"bench-{rng.randrange(10_000)}",
+        "page_url": f"/product/{product_id}",
+        "metadata": {"id": product_id, "name": f"Produit {product_id}"},
+    }
+    return "POST", "/api/v1/analytics", {"json": body}
+
+
+def webhook(rng, ctx):
+    n = next(ctx["sessions"])
+    product_id = rng.randrange(1, ctx["products"] + 1)
+    event = {
+        "id": f"evt_bench_{ctx['run_id']}_{n}",
+        "type": "checkout.session.completed",
+        "data": {
+            "object": {
+                "id": f"cs_bench_{ctx['run_id']}_{n}",
+                "amount_total": 12900,
+                "customer_details": {"email": f"bench{n}@example.com", "name": "Bench"},
+                "shipping_details": {"address": {"city": "Lyon", "country": "FR"}},
+                "metadata": {
+                    "items_summary": json.dumps([f"Produit {product_id}"]),
+                    "cart": json.dumps([[product_id, 1, 12900]]),
+                },
+            }
+        },
+    }
+    payload = json.dumps(event).encode()
+    headers = {"Stripe-Signature": stripe_signature(payload), "Content-Type": "application/json"}
+    return "POST", "/api/v1/webhook", {"content": payload, "headers": headers}
+
+
+def get_analytics_stats(rng, ctx):
+    return "GET", "/api/v1/analytics/stats", {"headers": ctx["auth"]}
+
+
+def get_orders(rng, ctx):
+    params = {"limit": 50}
+    if rng.random() < 0.5:
+        params["status"] = rng.choice(["paid", "shipped", "refunded"])
+    return "GET", "/api/v1/orders", {"params": params, "headers": ctx["auth"]}
+
+
+# nom -> (fabrique de requête, codes attendus)
+SCENARIOS = {
+    "get_products": (get_products, {200}),
+    "track": (track, {202}),
+    "webhook": (webhook, {200}),
+    "get_analytics_stats": (get_analytics_stats, {200}),
+    "get_orders": (get_orders, {200}),
+}
+
+
+def make_context(products, token, run_id=None):
+    return {
+        "products": max(products, 1),
+        "auth": {"Authorization": f"Bearer {token}"},
+        "sessions": itertools.count(),
+        "run_id": run_id or int(time.time() * 1000),
+    }
@@ -0,0 +1,134 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert
+
+
+# ==============================================================================
+# JEU DE DONNÉES DES BENCHMARKS (déterministe : même graine = même base)
+# ==============================================================================
+# Insertion en masse par paquets (INSERT multi-lignes), rollups remplis au fil
+# de l'eau comme le ferait l'ingestion. Les volumes sont notés dans
+# <dossier de travail>/seed.json : une base déjà remplie avec les mêmes
+# volumes est réutilisée telle quelle.
+
+CATEGORIES = ["Luxe", "Sport", "Maison", "Tech", "Mode", "Jardin", "Beauté", "Enfants"]
+EVENT_TYPES = [("page_view", 50), ("view_item", 30), ("add_to_cart", 12), ("begin_checkout", 5), ("purchase", 3)]
+STATUSES = [("paid", 80), ("shipped", 15), ("refunded", 5)]
+CHUNK = 10_000
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return lambda: rng.choices(values, weights)[0]
+
+
+def _chunks(total, size=CHUNK):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+def seed(volumes: dict, seed=42, days=30):
+    """Remplit la base de `main` : products, analytics_events, orders (+ lignes, rollups)."""
+    from app.core.rollups import aggregate, upsert_increments
+    from main import (
+        DailySalesStat, EventModel, OrderLineModel, OrderModel, ProductModel,
+        SessionLocal, product_search, record_event_rollups,
+    )
+
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    db = SessionLocal()
+    try:
+        # --- Catalogue ---
+        first_id = (db.query(func.max(ProductModel.id)).scalar() or 0) + 1
+        names = []
+        for start, size in _chunks(volumes["products"]):
+            rows = []
+            for n in range(first_id + start, first_id + start + size):
+                name = f"Produit {n}"
+                names.append((n, name))
+                rows.append(
+                    {
+                        "id": n,
+                        "name": name,
+                        "price": round(rng.uniform(5, 2000), 2),
+                        "category": rng.choice(CATEGORIES),
+                        "image_url": f"https://img.example.com/{n}.jpg",
+                        "description": f"Description du produit {n}",
+                    }
+                )
+            db.execute(insert(ProductModel), rows)
+            db.commit()
+        product_search.rebuild(db)
+        db.commit()
+        print(f"🌱 {volumes['products']} produits", flush=True)
+
+        # --- Événements (rollups mis à jour paquet par paquet) ---
+        event_type = _weighted(rng, EVENT_TYPES)
+        span = days * 86400
+        for start, size in _chunks(volumes["events"]):
+            rows = []
+            for _ in range(size):
+                kind = event_type()
+                product_id, product_name = rng.choice(names) if names and kind == "view_item" else (None, None)
+                rows.append(
+                    {
+                        "event_type": kind,
+                        "user_id": f"u{rng.randrange(100_000)}",
+                        "page_url": "/" if product_id is None else f"/product/{product_id}",
+                        "metadata_json": json.dumps({"id": product_id, "name": product_name} if product_id else {}),
+                        "product_id": product_id,
+                        "product_name": product_name,
+                        "occurred_at": now - timedelta(seconds=rng.randrange(span)),
+                    }
+                )
+            db.execute(insert(EventModel), rows)
+            record_event_rollups(db, rows)
+            db.commit()
+            if (start // CHUNK) % 50 == 49:
+                print(f"🌱 {start + size} événements...", flush=True)
+        print(f"🌱 {volumes['events']} événements", flush=True)
+
+        # --- Commandes + lignes ---
+        status = _weighted(rng, STATUSES)
+        first_order = (db.query(func.max(OrderModel.id)).scalar() or 0) + 1
+        for start, size in _chunks(volumes["orders"]):
+            orders, lines = [], []
+            for n in range(first_order + start, first_order + start + size):
+                placed_at = now - timedelta(seconds=rng.randrange(span))
+                picked = [rng.choice(names) for _ in range(rng.randint(1, 3))] if names else []
+                prices = [round(rng.uniform(5, 500), 2) for _ in picked]
+                orders.append(
+                    {
+                        "id": n,
+                        "stripe_id": f"cs_bench_{n}",
+                        "customer_email": f"client{n % 5000}@example.com",
+                        "customer_name": f"Client {n % 5000}",
+                        "total_amount": round(sum(prices), 2),
+                        "status": status(),
+                        "created_at": placed_at.isoformat(),
+                        "placed_at": placed_at,
+                        "shipping_address": {"city": "Paris", "country": "FR"},
+                    }
+                )
+                lines += [
+                    {"order_id": n, "product_id": pid, "name": name, "unit_price": price, "quantity": 1}
+                    for (pid, name), price in zip(picked, prices)
+                ]
+            db.execute(insert(OrderModel), orders)
+            if lines:
+                db.execute(insert(OrderLineModel), lines)
+            per_day = aggregate(
+                orders,
+                lambda o: o["created_at"][:10],
+                lambda o: {"orders": 1, "revenue": o["total_amount"]},
+            )
+            upsert_increments(
+                db, DailySalesStat.__table__, ["day"], [{"day": d, **c} for d, c in per_day.items()]
+            )
+            db.commit()
+        print(f"🌱 {volumes['orders']} commandes", flush=True)
+    finally:
+        db.close()
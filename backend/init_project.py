@@ -9,6 +9,7 @@ def init_structure():
         "app",
         "app/core",
         "app/models",
+        "app/migrations",
         "app/api",
         "app/api/v1" # Pour anticiper le versioning
     ]
@@ -21,8 +22,7 @@ def init_structure():
         "app/api/__init__.py",
         "app/api/v1/__init__.py",
         # On prépare aussi les fichiers où tu colleras le code ensuite
-        "app/core/database.py",
-        "app/models/product.py",
+        "app/migrations/__init__.py",
     ]
 
     # Création des dossiers
@@ -1,22 +1,56 @@
 import os
 import json
 import time
-import random
-import sys
-from datetime import datetime, timedelta
-from typing import List, Optional
+import csv
+import io
+import hashlib
+import hmac
+import math
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Union
 
 import stripe
 import resend
-from fastapi import FastAPI, Depends, HTTPException, status, Request, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, Query
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import Column, Integer, String, Float, create_engine, func, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session, relationship
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker, Session, selectinload
 from passlib.context import CryptContext
 from jose import JWTError, jwt
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.core.cache import MISSING, LRUCache
+from app.core.facets import FacetIndex
+from app.core.checkout import (
+    CheckoutClient, StripeAPI, StripeBusy, StripeTimeout, StubStripeAPI, cart_fingerprint,
+    join_metadata, split_metadata,
+)
+from app.core.compression import CompressionMiddleware, PrecompressedPayload, ResponseCompressor
+from app.core.hashing import HasherBusy, PasswordHasher
+from app.core.http_cache import VersionCounter, conditional, make_etag
+from app.core.inbox import PENDING as INBOX_PENDING, PROCESSED as INBOX_PROCESSED, InboxProcessor
+from app.core.ingestion import EventIngestionQueue
+from app.core.mailer import FakeSender, ResendSender
+from app.core.metrics import MetricsMiddleware, MetricsRegistry, instrument_queries
+from app.core.migrations import SchemaOutdated, check as check_schema, current_version, load_migrations, migrate
+from app.core.outbox import OutboxWorker
+from app.core.partitions import MonthlyPartitions
+from app.core.pool import PoolMetrics, instrument_engine, instrumented_pool_class, pool_options
+from app.core.pagination import (
+    cursor_value, decode_cursor, decode_keyset_cursor, encode_cursor, keyset_filter, order_by_clauses,
+)
+from app.core.ratelimit import SlidingWindowLimiter
+from app.core.rollups import add_event_rollups, dialect_insert, event_day, stream_events, upsert_increments
+from app.core.search import ProductSearchIndex
+from app.core.serialization import BACKEND as JSON_BACKEND, RawJSONResponse, dumps as json_bytes
+from app.models import (
+    AdminUser, DailyEventStat, DailyProductView, DailySalesStat, EventModel, OrderLineModel,
+    OrderModel, OutboxMessage, ProductModel, ReviewModel, StripeEventModel,
+)
 
 # ==============================================================================
 # 1. CONFIGURATION GLOBALE
@@ -42,31 +76,185 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 heures
 
 stripe.api_key = os.getenv("STRIPE_API_KEY")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+# inline : commande créée pendant la requête | queue : événement stocké, appliqué en tâche de fond
+STRIPE_WEBHOOK_MODE = os.getenv("STRIPE_WEBHOOK_MODE", "inline")
+# stripe : vraie API | stub : fausses sessions (local / tests, pas de clé nécessaire)
+STRIPE_BACKEND = os.getenv("STRIPE_BACKEND", "stripe")
+STRIPE_TIMEOUT = float(os.getenv("STRIPE_TIMEOUT", "10"))  # secondes par appel
+STRIPE_WORKERS = int(os.getenv("STRIPE_WORKERS", "4"))
+STRIPE_MAX_PENDING = int(os.getenv("STRIPE_MAX_PENDING", "32"))
+# Un panier identique (même checkout_id envoyé par le front) réutilise sa session pendant ce délai
+CHECKOUT_REUSE_TTL = float(os.getenv("CHECKOUT_REUSE_TTL", "60"))  # secondes
+# Noms tronqués dans les métadonnées Stripe : 50 articles tiennent dans ses 50 clés
+CHECKOUT_NAME_MAX = 120
 resend.api_key = RESEND_API_KEY
 
+# --- Ingestion analytics (buffer + inserts groupés) ---
+ANALYTICS_BATCH_SIZE = int(os.getenv("ANALYTICS_BATCH_SIZE", "500"))
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "1.0"))  # secondes
+ANALYTICS_MAX_PENDING = int(os.getenv("ANALYTICS_MAX_PENDING", "50000"))
+
+# --- Stockage des événements analytics (découpage mensuel + rétention) ---
+EVENTS_PREMAKE_MONTHS = int(os.getenv("EVENTS_PREMAKE_MONTHS", "3"))  # partitions créées à l'avance (Postgres)
+EVENTS_HOT_MONTHS = int(os.getenv("EVENTS_HOT_MONTHS", "1"))  # mois gardés dans la table chaude (SQLite)
+EVENTS_RETENTION_MONTHS = int(os.getenv("EVENTS_RETENTION_MONTHS", "0"))  # 0 = on garde tout
+EVENTS_RETENTION_MODE = os.getenv("EVENTS_RETENTION_MODE", "drop")  # drop | archive
+EVENTS_MAINTENANCE_INTERVAL = float(os.getenv("EVENTS_MAINTENANCE_INTERVAL", "21600"))  # secondes, 0 = off
+
+# --- Cache catalogue (en mémoire, par instance) ---
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "10000"))  # fiches produit
+CATALOG_LIST_CACHE_SIZE = int(os.getenv("CATALOG_LIST_CACHE_SIZE", "256"))  # listes / pages
+# Borne la durée de vie d'une entrée : les autres instances ne sont pas invalidées
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))  # secondes
+
+# --- Cache HTTP (ETag) ---
+# Par défaut le navigateur revalide à chaque navigation (304 si rien n'a changé)
+HTTP_CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "public, max-age=0, must-revalidate")
+# Les ETags changent au moins à cette fréquence : les compteurs de version sont
+# par instance, une instance sans écriture ne confirme pas (304) plus longtemps
+ETAG_EPOCH_SECONDS = float(os.getenv("ETAG_EPOCH_SECONDS", str(CATALOG_CACHE_TTL)))
+# Listes produits / avis encodées directement en bytes (orjson) et mises en cache
+# (opt-in : FAST_JSON_RESPONSES=1)
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "0") == "1"
+
+# --- Compression des réponses (Accept-Encoding : br, gzip) ---
+COMPRESSION_ENCODINGS = [e for e in os.getenv("COMPRESSION_ENCODINGS", "br,gzip").split(",") if e]  # vide = off
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "500"))  # octets
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# --- Recherche plein texte (Postgres : configuration text search utilisée) ---
+SEARCH_TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "simple")
+
+# --- Facettes catalogue (index en mémoire) ---
+FACET_PRICE_BUCKETS = [
+    float(x) for x in os.getenv("FACET_PRICE_BUCKETS", "50,100,250,500,1000").split(",") if x
+]
+FACET_RELOAD_INTERVAL = float(os.getenv("FACET_RELOAD_INTERVAL", "300"))  # secondes
+
+# --- Pool de connexions (par moteur : sync et async) ---
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # secondes d'attente max
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # secondes
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "idle")  # always | idle | never
+DB_POOL_PING_IDLE = float(os.getenv("DB_POOL_PING_IDLE", "30"))  # secondes (mode idle)
+
+# --- Schéma & démarrage à froid ---
+# Prod : le schéma est migré avant le déploiement (`python manage.py migrate`),
+# le démarrage vérifie seulement sa version. Local (SQLite) : migré au démarrage.
+SCHEMA_AUTO_MIGRATE = os.getenv("SCHEMA_AUTO_MIGRATE", "0" if DATABASE_URL else "1") == "1"
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))  # import + startup
+
+# --- Cache des tokens admin vérifiés ---
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "60"))  # secondes
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+
+# --- Login : bcrypt hors event loop + limitation des tentatives ---
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", "16"))
+LOGIN_MAX_FAILURES_PER_USER = int(os.getenv("LOGIN_MAX_FAILURES_PER_USER", "5"))
+LOGIN_USER_WINDOW = float(os.getenv("LOGIN_USER_WINDOW", "300"))  # secondes
+# Échecs seulement : les connexions réussies d'une même IP ne bloquent personne
+LOGIN_MAX_FAILURES_PER_IP = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", "20"))
+LOGIN_IP_WINDOW = float(os.getenv("LOGIN_IP_WINDOW", "60"))  # secondes
+# Nombre de proxies de confiance devant l'API pour lire X-Forwarded-For.
+# Sur Cloud Run (K_SERVICE défini) le load balancer est toujours là : 1 par défaut,
+# sinon toutes les requêtes auraient son IP.
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "1" if os.getenv("K_SERVICE") else "0"))
+
+# --- Observabilité : GET /metrics (format Prometheus) ---
+# Vide = pas d'authentification en local ; en prod (DATABASE_URL) la route est
+# désactivée sans token : le service Cloud Run est public
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_ENABLED = bool(METRICS_TOKEN) or not DATABASE_URL
+
+# --- Emails : outbox durable, envoyée par un worker ---
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "resend" if RESEND_API_KEY else "fake")
+EMAIL_FROM = os.getenv("EMAIL_FROM", "onboarding@resend.dev")
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "4"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+# Worker dans le process de l'API (défaut : aucun déploiement n'en lance d'autre,
+# sinon les emails resteraient en attente). 0 quand un `python manage.py
+# outbox-worker` séparé tourne (docker-compose). Plusieurs workers sur PostgreSQL
+# se partagent les messages (SKIP LOCKED).
+OUTBOX_INLINE_WORKER = os.getenv("OUTBOX_INLINE_WORKER", "1") == "1"
+
 # --- Outils de hachage & Token ---
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(
+    pwd_context, max_workers=BCRYPT_WORKERS, max_pending=BCRYPT_MAX_PENDING
+)
+login_user_limiter = SlidingWindowLimiter(LOGIN_MAX_FAILURES_PER_USER, LOGIN_USER_WINDOW)
+login_ip_limiter = SlidingWindowLimiter(LOGIN_MAX_FAILURES_PER_IP, LOGIN_IP_WINDOW)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/token")
 
 # ==============================================================================
 # 2. BASE DE DONNÉES
 # ==============================================================================
 
+sync_pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+# Latence par route, requêtes SQL par requête HTTP, requêtes en cours (GET /metrics)
+metrics_registry = MetricsRegistry()
+
+POOL_OPTIONS = pool_options(
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+)
+
 if DATABASE_URL:
     # PROD : On utilise PostgreSQL
     if DATABASE_URL.startswith("postgres://"):
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+    engine = create_engine(
+        DATABASE_URL,
+        poolclass=instrumented_pool_class(sync_pool_metrics),
+        **POOL_OPTIONS,
+    )
 else:
     # LOCAL : On reste sur SQLite
     print("⚠️  Mode Local : Utilisation de empire.db")
     SQLALCHEMY_DATABASE_URL = "sqlite:///./empire.db"
     engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=instrumented_pool_class(sync_pool_metrics),
     )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+
+
+# --- Moteur async (routes chaudes) : asyncpg en prod, aiosqlite en local ---
+
+def to_async_url(url: str) -> str:
+    for prefix in ("postgresql+psycopg2://", "postgresql://"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+if DATABASE_URL:
+    async_engine = create_async_engine(
+        to_async_url(DATABASE_URL),
+        poolclass=instrumented_pool_class(async_pool_metrics, is_async=True),
+        **POOL_OPTIONS,
+    )
+else:
+    async_engine = create_async_engine(
+        to_async_url(SQLALCHEMY_DATABASE_URL),
+        poolclass=instrumented_pool_class(async_pool_metrics, is_async=True),
+    )
+
+for _engine, _metrics in ((engine, sync_pool_metrics), (async_engine, async_pool_metrics)):
+    instrument_engine(_engine, _metrics, DB_POOL_PRE_PING, DB_POOL_PING_IDLE)
+instrument_queries(engine, metrics_registry)
+instrument_queries(async_engine.sync_engine, metrics_registry)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 
 
 def get_db():
@@ -77,72 +265,78 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 # ==============================================================================
-# 3. MODÈLES SQL (TABLES)
+# 3. MODÈLES SQL (TABLES) -> app/models/, schéma géré par app/migrations/
 # ==============================================================================
 
-class AdminUser(Base):
-    __tablename__ = "admins"
-    id = Column(Integer, primary_key=True, index=True)
-    username = Column(String, unique=True, index=True)
-    hashed_password = Column(String)
-
-
-class ProductModel(Base):
-    __tablename__ = "products"
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
-    price = Column(Float)
-    category = Column(String)
-    image_url = Column(String)
-    description = Column(String, nullable=True)
-    
-    # Relation vers les avis
-    reviews = relationship(
-        "ReviewModel", back_populates="product", cascade="all, delete-orphan"
-    )
+# analytics_events découpée par mois (partitions PostgreSQL / tables SQLite)
+event_partitions = MonthlyPartitions(
+    EventModel.__table__, "occurred_at", premake=EVENTS_PREMAKE_MONTHS
+)
 
+# Migrations connues du code (app/migrations/), comparées à schema_version au démarrage
+MIGRATIONS = load_migrations()
+
+# Cache du catalogue : fiches par id + listes/pages par jeu de paramètres.
+# Invalidé (ou mis à jour sur place) par les routes admin produits. Chaque
+# entrée porte la version du catalogue lue AVANT la requête SQL : une lecture
+# qui croise une écriture ne remet pas l'ancienne donnée en cache.
+product_cache = LRUCache(maxsize=CATALOG_CACHE_SIZE, ttl=CATALOG_CACHE_TTL)
+product_list_cache = LRUCache(maxsize=CATALOG_LIST_CACHE_SIZE, ttl=CATALOG_CACHE_TTL)
+# Réponses déjà encodées (bytes + variantes gzip / br) des listes produits / avis,
+# clé = version + paramètres. Vidé avec product_list_cache : les entrées des
+# anciennes versions ne restent pas en mémoire jusqu'à leur éviction.
+payload_cache = LRUCache(maxsize=CATALOG_LIST_CACHE_SIZE, ttl=CATALOG_CACHE_TTL)
+
+response_compressor = ResponseCompressor(
+    COMPRESSION_ENCODINGS,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    gzip_level=COMPRESSION_GZIP_LEVEL,
+    brotli_quality=COMPRESSION_BROTLI_QUALITY,
+)
 
-class ReviewModel(Base):
-    __tablename__ = "reviews"
-    id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id"))
-    author = Column(String)
-    rating = Column(Integer)
-    comment = Column(String)
-    created_at = Column(String, default=lambda: datetime.now().isoformat())
+# Index plein texte (FTS5 / tsvector), créé par les migrations
+product_search = ProductSearchIndex(SEARCH_TS_CONFIG)
 
-    product = relationship("ProductModel", back_populates="reviews")
+# Compteurs par catégorie / tranche de prix, chargés au premier appel
+facet_index = FacetIndex(FACET_PRICE_BUCKETS, reload_interval=FACET_RELOAD_INTERVAL)
 
+# Tokens JWT déjà vérifiés (clé = sha256 du token) -> admin. Évite le décodage
+# et la requête AdminUser à chaque poll du dashboard.
+token_cache = LRUCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
 
-class OrderModel(Base):
-    __tablename__ = "orders"
-    id = Column(Integer, primary_key=True, index=True)
-    stripe_id = Column(String, index=True) # Ajout index pour perf
-    customer_email = Column(String)
-    customer_name = Column(String, nullable=True)
-    total_amount = Column(Float)
-    status = Column(String)
-    created_at = Column(String, default=lambda: datetime.now().isoformat())
-    items_json = Column(String, default="[]")
-    shipping_address_json = Column(String, default="{}")
+# Versions pour les ETags : catalogue (global) et avis (par produit)
+catalog_version = VersionCounter()
+review_versions = VersionCounter()
 
 
-class EventModel(Base):
-    __tablename__ = "analytics_events"
-    id = Column(Integer, primary_key=True, index=True)
-    event_type = Column(String, index=True)
-    user_id = Column(String, index=True)
-    page_url = Column(String)
-    metadata_json = Column(String)
-    created_at = Column(String, default=lambda: datetime.now().isoformat())
+def cached_product(product_id):
+    """Fiche en cache, seulement si elle date de la version courante du catalogue."""
+    entry = product_cache.get(product_id)
+    if entry is MISSING or entry[0] != catalog_version.get():
+        return MISSING
+    return entry[1]
 
 
-# Création des tables au démarrage (Mode Safe)
-try:
-    Base.metadata.create_all(bind=engine)
-except Exception as e:
-    print(f"❌ Erreur Init DB (Peut être ignoré en prod si déjà fait): {e}")
+def cache_product(product_id, data, version):
+    # Le catalogue a changé pendant la lecture : la donnée est peut-être déjà périmée
+    if version == catalog_version.get():
+        product_cache.set(product_id, (version, data))
+
+# File d'ingestion des événements analytics (vidée par un thread dédié)
+event_queue = EventIngestionQueue(
+    SessionLocal,
+    EventModel.__table__,
+    batch_size=ANALYTICS_BATCH_SIZE,
+    flush_interval=ANALYTICS_FLUSH_INTERVAL,
+    max_pending=ANALYTICS_MAX_PENDING,
+    on_flush=lambda db, rows: record_event_rollups(db, rows),
+)
 
 app = FastAPI(title="Empire E-commerce API")
 
@@ -162,6 +356,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if response_compressor.encodings:
+    app.add_middleware(CompressionMiddleware, compressor=response_compressor)
+# Ajouté en dernier = le plus externe : mesure aussi CORS et les erreurs
+app.add_middleware(MetricsMiddleware, registry=metrics_registry)
 
 
 # ==============================================================================
@@ -176,6 +374,14 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+def client_ip(request: Request) -> str:
+    forwarded = request.headers.get("x-forwarded-for")
+    if TRUSTED_PROXY_HOPS and forwarded:
+        hops = [h.strip() for h in forwarded.split(",")]
+        return hops[max(0, len(hops) - TRUSTED_PROXY_HOPS)]
+    return request.client.host if request.client else "unknown"
+
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -184,13 +390,18 @@ def create_access_token(data: dict):
 
 
 async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Non autorisé",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    token_key = hashlib.sha256(token.encode()).hexdigest()
+    cached = token_cache.get(token_key)
+    if cached is not MISSING:
+        return cached
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -199,10 +410,16 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(AdminUser).filter(AdminUser.username == username).first()
+    user = await db.scalar(select(AdminUser).where(AdminUser.username == username))
     if user is None:
         raise credentials_exception
-    return user
+
+    # Copie détachée (sans le hash) partagée entre requêtes ; jamais au-delà de l'expiration
+    principal = AdminUser(id=user.id, username=user.username)
+    ttl = min(TOKEN_CACHE_TTL, payload.get("exp", 0) - time.time())
+    if ttl > 0:
+        token_cache.set(token_key, principal, ttl=ttl)
+    return principal
 
 
 def create_email_html(customer_name, amount, items_list, address):
@@ -218,18 +435,149 @@ def create_email_html(customer_name, amount, items_list, address):
     """
 
 
-def send_confirmation_email(to_email, name, amount, items, address):
-    if not RESEND_API_KEY:
-        return
+if EMAIL_BACKEND == "resend":
+    mailer = ResendSender(resend, EMAIL_FROM)
+else:
+    mailer = FakeSender()
+
+
+def send_confirmation_email(payload: dict):
+    # Appelé par le worker outbox : une exception déclenche un nouvel essai
+    mailer.send(
+        payload["to"],
+        "Commande Confirmée",
+        create_email_html(
+            payload["name"], payload["amount"], payload["items"], payload["address"]
+        ),
+    )
+
+
+OUTBOX_HANDLERS = {"order_confirmation_email": send_confirmation_email}
+
+
+# --- Stripe Checkout (pool de threads borné + réutilisation des sessions) ---
+checkout_client = CheckoutClient(
+    StubStripeAPI() if STRIPE_BACKEND == "stub" else StripeAPI(stripe, timeout=STRIPE_TIMEOUT),
+    max_workers=STRIPE_WORKERS,
+    max_pending=STRIPE_MAX_PENDING,
+    timeout=STRIPE_TIMEOUT + 5,  # filet de sécurité au-dessus du timeout réseau
+    reuse_ttl=CHECKOUT_REUSE_TTL,
+)
+
+
+def make_outbox_worker(**options) -> OutboxWorker:
+    options.setdefault("concurrency", OUTBOX_CONCURRENCY)
+    options.setdefault("max_attempts", OUTBOX_MAX_ATTEMPTS)
+    return OutboxWorker(SessionLocal, OutboxMessage, OUTBOX_HANDLERS, **options)
+
+
+# --- Rollups analytics ---
+
+def event_product(metadata) -> tuple:
+    """(id, nom) du produit concerné par un événement, extraits de ses métadonnées."""
+    if not isinstance(metadata, dict):
+        return None, None
+    product_id = metadata.get("product_id", metadata.get("id"))
     try:
-        resend.Emails.send({
-            "from": "onboarding@resend.dev",
-            "to": to_email,
-            "subject": "Commande Confirmée",
-            "html": create_email_html(name, amount, items, address)
-        })
-    except Exception as e:
-        print(f"❌ Erreur email: {e}")
+        product_id = int(product_id) if product_id is not None else None
+    except (TypeError, ValueError):
+        product_id = None
+    name = metadata.get("product_name", metadata.get("name"))
+    return product_id, (str(name)[:200] if name is not None else None)
+
+
+def record_event_rollups(db: Session, rows):
+    """Incrémente les rollups pour un lot d'événements (même transaction que l'INSERT)."""
+    add_event_rollups(db, rows, DailyEventStat.__table__, DailyProductView.__table__)
+
+
+def record_order_rollup(db: Session, created_at: str, amount: float):
+    upsert_increments(
+        db,
+        DailySalesStat.__table__,
+        ["day"],
+        [{"day": created_at[:10], "orders": 1, "revenue": amount or 0.0}],
+    )
+
+
+def compact_event_month(source, start, end):
+    """Avant de supprimer un mois d'événements bruts : les jours qui n'ont
+    aucun rollup (événements antérieurs aux rollups) y sont ajoutés."""
+    db = SessionLocal()
+    try:
+        first, last = start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+        covered = {
+            day
+            for (day,) in db.query(DailyEventStat.day)
+            .filter(DailyEventStat.day >= first, DailyEventStat.day < last)
+            .distinct()
+        }
+        in_month = (source.c.occurred_at >= start) & (source.c.occurred_at < end)
+        rows = [r for r in stream_events(db, source, in_month) if event_day(r) not in covered]
+        record_event_rollups(db, rows)
+        db.commit()
+        if rows:
+            print(f"📊 {len(rows)} événements compactés dans les rollups ({start:%Y-%m})", flush=True)
+    finally:
+        db.close()
+
+
+def run_events_maintenance() -> dict:
+    """Partitions à venir, rotation de la table chaude (SQLite), rétention."""
+    event_partitions.ensure(engine)
+    moved = event_partitions.rotate(engine, EVENTS_HOT_MONTHS)
+    expired = event_partitions.expire(
+        engine,
+        EVENTS_RETENTION_MONTHS,
+        EVENTS_RETENTION_MODE,
+        before_drop=compact_event_month,
+    )
+    return {"moved": moved, "expired": expired}
+
+
+# --- Commandes ---
+
+def order_lines_from_session(session: dict):
+    """Lignes de commande à partir des métadonnées de la session Stripe.
+
+    `cart` = [[product_id, quantité, prix unitaire en centimes], ...] (écrit par
+    checkout) ; à défaut on n'a que les noms (`items_summary`)."""
+    metadata = session.get("metadata") or {}
+    names = json.loads(join_metadata(metadata, "items_summary") or "[]")
+    cart = json.loads(join_metadata(metadata, "cart") or "[]")
+    if cart:
+        return [
+            {
+                "product_id": product_id,
+                "name": names[n] if n < len(names) else None,
+                "unit_price": cents / 100,
+                "quantity": quantity,
+            }
+            for n, (product_id, quantity, cents) in enumerate(cart)
+        ]
+    return [{"name": name, "quantity": 1} for name in names]
+
+
+def order_to_dict(o: OrderModel) -> dict:
+    return {
+        "id": o.id,
+        "stripe_id": o.stripe_id,
+        "customer": o.customer_name,
+        "email": o.customer_email,
+        "amount": o.total_amount,
+        "status": o.status,
+        "date": o.placed_at.isoformat() if o.placed_at else o.created_at,
+        "items": [
+            {
+                "product_id": line.product_id,
+                "name": line.name,
+                "unit_price": line.unit_price,
+                "quantity": line.quantity,
+            }
+            for line in o.lines
+        ],
+        "address": o.shipping_address or {},
+    }
 
 
 # ==============================================================================
@@ -251,14 +599,24 @@ class ProductCreateSchema(BaseModel):
 
 class ProductSchema(ProductCreateSchema):
     id: int
+    rating_count: int = 0
+    rating_average: Optional[float] = None
+    rating_histogram: Dict[str, int] = {}
 
     class Config:
         from_attributes = True
 
 
+class ProductPageSchema(BaseModel):
+    items: List[ProductSchema]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+
+
 class ReviewCreateSchema(BaseModel):
     author: str
-    rating: int
+    rating: int = Field(ge=1, le=5)
     comment: str
 
 
@@ -270,8 +628,14 @@ class ReviewSchema(ReviewCreateSchema):
         from_attributes = True
 
 
+class ReviewPageSchema(BaseModel):
+    items: List[ReviewSchema]
+    next_cursor: Optional[str] = None
+
+
 class AnalyticsSchema(BaseModel):
-    event_type: str
+    # Reçu du public et utilisé comme nom de dossier par l'export : liste blanche
+    event_type: str = Field(..., min_length=1, max_length=64, pattern="^[A-Za-z0-9_-]+$")
     user_id: str
     page_url: str
     metadata: dict = {}
@@ -279,13 +643,17 @@ class AnalyticsSchema(BaseModel):
 
 class CartItem(BaseModel):
     id: int
-    name: str
-    price: float
-    quantity: int = 1
+    quantity: int = Field(1, ge=1, le=99)
+    # Envoyés par le front mais ignorés : nom et prix viennent du catalogue
+    name: Optional[str] = None
+    price: Optional[float] = None
 
 
 class CheckoutSchema(BaseModel):
-    items: List[CartItem]
+    items: List[CartItem] = Field(..., min_length=1, max_length=50)
+    # Identifiant aléatoire généré par le navigateur (un par panier) : seule
+    # clé qui permet de réutiliser une session Stripe sans la donner à un autre client
+    checkout_id: Optional[str] = Field(None, min_length=16, max_length=64, pattern="^[A-Za-z0-9_-]+$")
 
 
 # ==============================================================================
@@ -304,11 +672,40 @@ def debug_config(db: Session = Depends(get_db)):
 
 @app.post("/api/v1/token", response_model=Token)
 async def login(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = db.query(AdminUser).filter(AdminUser.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # Refus immédiat (avant tout bcrypt) si trop d'échecs récents
+    user_key = f"user:{form_data.username.lower()}"
+    ip_key = f"ip:{client_ip(request)}"
+    wait = max(
+        login_user_limiter.retry_after(user_key), login_ip_limiter.retry_after(ip_key)
+    )
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="Trop de tentatives, réessayez plus tard",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+    user = await db.scalar(
+        select(AdminUser).where(AdminUser.username == form_data.username)
+    )
+    valid = False
+    if user:
+        try:
+            valid = await password_hasher.verify(form_data.password, user.hashed_password)
+        except HasherBusy:
+            raise HTTPException(
+                status_code=503, detail="Serveur occupé", headers={"Retry-After": "1"}
+            )
+    if not valid:
+        login_user_limiter.hit(user_key)
+        login_ip_limiter.hit(ip_key)
         raise HTTPException(status_code=401, detail="Identifiants incorrects")
+
+    login_user_limiter.reset(user_key)
     return {
         "access_token": create_access_token(data={"sub": user.username}),
         "token_type": "bearer",
@@ -320,19 +717,313 @@ async def me(u: AdminUser = Depends(get_current_user)):
     return {"username": u.username}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if METRICS_TOKEN and not hmac.compare_digest(
+        request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Token metrics invalide")
+    return Response(
+        metrics_registry.render({"sync": sync_pool_metrics, "async": async_pool_metrics}),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@app.get("/api/v1/admin/runtime")
+def runtime_stats(
+    db: Session = Depends(get_db), u: AdminUser = Depends(get_current_user)
+):
+    return {
+        "analytics_ingestion": event_queue.stats(),
+        "analytics_storage": {
+            "partitioned": event_partitions.native,
+            "months": [name for name, _, _ in event_partitions.partitions(db.connection())],
+            "retention_months": EVENTS_RETENTION_MONTHS,
+        },
+        "outbox": dict(
+            db.query(OutboxMessage.status, func.count()).group_by(OutboxMessage.status).all()
+        ),
+        "checkout": checkout_client.stats(),
+        "startup": {**STARTUP_TIMINGS, "schema_version": current_version(db.connection())},
+        "stripe_events": {
+            "processor": stripe_event_processor.stats(),
+            "by_status": dict(
+                db.query(StripeEventModel.status, func.count())
+                .group_by(StripeEventModel.status)
+                .all()
+            ),
+        },
+        "db_pool": {
+            "sync": sync_pool_metrics.stats(),
+            "async": async_pool_metrics.stats(),
+        },
+        "token_cache": token_cache.stats(),
+        "login": {
+            "hasher": password_hasher.stats(),
+            "user_limiter": login_user_limiter.stats(),
+            "ip_limiter": login_ip_limiter.stats(),
+        },
+        "catalog_cache": {
+            "products": product_cache.stats(),
+            "lists": product_list_cache.stats(),
+            "payloads": {**payload_cache.stats(), "encoder": JSON_BACKEND},
+            "facets": facet_index.stats(),
+        },
+        "compression": response_compressor.stats(),
+    }
+
+
 # --- PRODUITS ---
 
-@app.get("/api/v1/products", response_model=List[ProductSchema])
-def get_products(db: Session = Depends(get_db)):
-    return db.query(ProductModel).order_by(ProductModel.id.desc()).all()
+# Tris disponibles : colonnes de tri (la dernière est toujours l'id, unique)
+PRODUCT_SORTS = {
+    "newest": ([ProductModel.id], [True]),
+    "price_asc": ([ProductModel.price, ProductModel.id], [False, False]),
+    "price_desc": ([ProductModel.price, ProductModel.id], [True, True]),
+}
+
+
+async def exact_count(db: AsyncSession, stmt) -> int:
+    return await db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+
+
+async def estimate_count(db: AsyncSession, stmt) -> int:
+    """Nombre de lignes estimé par le planner Postgres (pas de scan complet)."""
+    dialect = db.get_bind().dialect
+    if dialect.name != "postgresql":
+        return await exact_count(db, stmt)
+    sql = stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    plan = await db.scalar(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def cached_json_response(request: Request, payload: PrecompressedPayload, etag: str):
+    """Corps en cache, compressé une seule fois par encodage (le middleware n'y touche plus)."""
+    headers = {"ETag": etag, "Cache-Control": HTTP_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    body, encoding = await payload.encoded(response_compressor, request.headers.get("accept-encoding"))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        headers["ETag"] = "W/" + etag
+    return RawJSONResponse(body, headers=headers)
+
+
+@app.get(
+    "/api/v1/products",
+    response_model=Union[ProductPageSchema, List[ProductSchema]],
+)
+async def get_products(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    all: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = Query(24, ge=1, le=100),
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    sort: str = Query("newest", pattern="^(newest|price_asc|price_desc)$"),
+    count: str = Query("none", pattern="^(none|exact|estimate)$"),
+):
+    # Version lue avant la requête : une écriture concurrente ne peut pas
+    # laisser en cache une ancienne liste sous la nouvelle version
+    version = catalog_version.get()
+    etag = make_etag("products", version, request.url.query, epoch_seconds=ETAG_EPOCH_SECONDS)
+    not_modified = conditional(request, response, etag, HTTP_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+
+    key = (version, all, cursor, limit, category, min_price, max_price, sort, count)
+    if FAST_JSON_RESPONSES:
+        payload_key = ("products", key)
+        payload = payload_cache.get(payload_key)
+        if payload is MISSING:
+            payload = PrecompressedPayload(json_bytes(
+                await query_products(db, all, cursor, limit, category, min_price, max_price, sort, count)
+            ))
+            if catalog_version.get() == version:
+                payload_cache.set(payload_key, payload)
+        return await cached_json_response(request, payload, etag)
+
+    cached = product_list_cache.get(key)
+    if cached is not MISSING:
+        return cached
+
+    result = await query_products(
+        db, all, cursor, limit, category, min_price, max_price, sort, count
+    )
+    if catalog_version.get() == version:
+        product_list_cache.set(key, result)
+    return result
+
+
+def product_to_dict(p: ProductModel) -> dict:
+    return ProductSchema.model_validate(p).model_dump()
+
+
+# Colonnes lues par les listes (tuples, sans objets ORM) -> même dict que product_to_dict
+PRODUCT_LIST_COLUMNS = (
+    ProductModel.name, ProductModel.price, ProductModel.category, ProductModel.image_url,
+    ProductModel.description, ProductModel.id, ProductModel.rating_count, ProductModel.rating_sum,
+    ProductModel.rating_1, ProductModel.rating_2, ProductModel.rating_3, ProductModel.rating_4,
+    ProductModel.rating_5,
+)
+
+
+def product_row_to_dict(row) -> dict:
+    name, price, category, image_url, description, pid, count, total, *histogram = row
+    count = count or 0
+    return {
+        "name": name,
+        "price": price,
+        "category": category,
+        "image_url": image_url,
+        "description": description,
+        "id": pid,
+        "rating_count": count,
+        "rating_average": round(total / count, 2) if count else None,
+        "rating_histogram": {str(n): v or 0 for n, v in enumerate(histogram, 1)},
+    }
+
+
+async def query_products(db, all, cursor, limit, category, min_price, max_price, sort, count):
+    # Ancien comportement (liste complète), gardé pour le frontend actuel : ?all=true
+    if all:
+        version = catalog_version.get()
+        result = await db.execute(select(*PRODUCT_LIST_COLUMNS).order_by(ProductModel.id.desc()))
+        products = [product_row_to_dict(row) for row in result]
+        # On en profite pour remplir le cache des fiches
+        for p in products:
+            cache_product(p["id"], p, version)
+        return products
+
+    stmt = select(*PRODUCT_LIST_COLUMNS)
+    if category is not None:
+        stmt = stmt.where(ProductModel.category == category)
+    if min_price is not None:
+        stmt = stmt.where(ProductModel.price >= min_price)
+    if max_price is not None:
+        stmt = stmt.where(ProductModel.price <= max_price)
+
+    total = None
+    if count == "exact":
+        total = await exact_count(db, stmt)
+    elif count == "estimate":
+        total = await estimate_count(db, stmt)
+
+    columns, descending = PRODUCT_SORTS[sort]
+    if cursor:
+        stmt = stmt.where(
+            keyset_filter(columns, decode_keyset_cursor(cursor, columns), descending)
+        )
+
+    # On lit une ligne de plus pour savoir s'il existe une page suivante
+    stmt = stmt.order_by(*order_by_clauses(columns, descending)).limit(limit + 1)
+    items = [product_row_to_dict(row) for row in await db.execute(stmt)]
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor([items[-1][c.key] for c in columns])
+
+    return {
+        "items": items,
+        "next_cursor": next_cursor,
+        "total": total,
+        "total_is_estimate": count == "estimate",
+    }
+
+
+@app.get("/api/v1/products/search", response_model=ProductPageSchema)
+async def search_products(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    q: str = Query(..., min_length=1, max_length=100),
+    cursor: Optional[str] = None,
+    limit: int = Query(24, ge=1, le=100),
+    category: Optional[str] = None,
+):
+    # Déclarée avant /products/{id}, sinon "search" serait pris pour un id
+    version = catalog_version.get()
+    etag = make_etag("search", version, request.url.query, epoch_seconds=ETAG_EPOCH_SECONDS)
+    not_modified = conditional(request, response, etag, HTTP_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+
+    key = ("search", version, q.lower(), cursor, limit, category)
+    cached = product_list_cache.get(key)
+    if cached is not MISSING:
+        return cached
+
+    # Résultats classés par pertinence : le curseur est un simple décalage
+    offset = cursor_value(decode_cursor(cursor, 1)[0], int) if cursor else 0
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+    ids = await product_search.search(db, q, limit + 1, offset, category)
+    next_cursor = encode_cursor([offset + limit]) if len(ids) > limit else None
+    ids = ids[:limit]
+
+    rows = await db.scalars(select(ProductModel).where(ProductModel.id.in_(ids)))
+    by_id = {p.id: product_to_dict(p) for p in rows}
+    result = {
+        "items": [by_id[i] for i in ids if i in by_id],
+        "next_cursor": next_cursor,
+        "total": None,
+        "total_is_estimate": False,
+    }
+    if catalog_version.get() == version:
+        product_list_cache.set(key, result)
+    return result
+
+
+@app.get("/api/v1/products/facets")
+async def product_facets(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+):
+    etag = make_etag(
+        "facets", catalog_version.get(), request.url.query, epoch_seconds=ETAG_EPOCH_SECONDS
+    )
+    not_modified = conditional(request, response, etag, HTTP_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+
+    if facet_index.stale:
+        rows = await db.execute(
+            select(ProductModel.id, ProductModel.category, ProductModel.price)
+        )
+        facet_index.load(rows.all())
+    return facet_index.facets(category, min_price, max_price)
 
 
 @app.get("/api/v1/products/{id}", response_model=ProductSchema)
-def get_product(id: int, db: Session = Depends(get_db)):
-    p = db.query(ProductModel).filter(ProductModel.id == id).first()
+async def get_product(
+    id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
+    version = catalog_version.get()
+    etag = make_etag("product", id, version, epoch_seconds=ETAG_EPOCH_SECONDS)
+    not_modified = conditional(request, response, etag, HTTP_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+
+    cached = cached_product(id)
+    if cached is not MISSING:
+        return cached
+
+    p = await db.get(ProductModel, id)
     if not p:
         raise HTTPException(status_code=404, detail="Produit non trouvé")
-    return p
+    data = product_to_dict(p)
+    cache_product(id, data, version)
+    return data
 
 
 @app.post("/api/v1/products", response_model=ProductSchema)
@@ -343,8 +1034,15 @@ def create_product(
 ):
     new_p = ProductModel(**p.dict())
     db.add(new_p)
+    db.flush()
+    product_search.index_product(db, new_p)
     db.commit()
     db.refresh(new_p)
+
+    product_list_cache.clear()
+    payload_cache.clear()
+    facet_index.upsert(new_p.id, new_p.category, new_p.price)
+    cache_product(new_p.id, product_to_dict(new_p), catalog_version.bump())
     return new_p
 
 
@@ -362,8 +1060,14 @@ def update_product(
     for k, v in p.dict().items():
         setattr(db_p, k, v)
 
+    product_search.index_product(db, db_p)
     db.commit()
     db.refresh(db_p)
+
+    product_list_cache.clear()
+    payload_cache.clear()
+    facet_index.upsert(db_p.id, db_p.category, db_p.price)
+    cache_product(db_p.id, product_to_dict(db_p), catalog_version.bump())
     return db_p
 
 
@@ -374,31 +1078,110 @@ def delete_product(
     p = db.query(ProductModel).filter(ProductModel.id == id).first()
     if p:
         db.delete(p)
+        product_search.remove(db, id)
         db.commit()
+
+    product_cache.delete(id)
+    product_list_cache.clear()
+    payload_cache.clear()
+    facet_index.remove(id)
+    catalog_version.bump()
+    review_versions.bump(id)
     return {"status": "deleted"}
 
 
 # --- AVIS ---
 
-@app.get("/api/v1/products/{id}/reviews", response_model=List[ReviewSchema])
-def get_reviews(id: int, db: Session = Depends(get_db)):
-    return (
-        db.query(ReviewModel)
-        .filter(ReviewModel.product_id == id)
-        .order_by(ReviewModel.created_at.desc())
-        .all()
-    )
+REVIEW_SORT = ([ReviewModel.created_at, ReviewModel.id], [True, True])
+
+
+@app.get(
+    "/api/v1/products/{id}/reviews",
+    response_model=Union[ReviewPageSchema, List[ReviewSchema]],
+)
+async def get_reviews(
+    id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    all: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+):
+    version = review_versions.get(id)
+    etag = make_etag("reviews", id, version, request.url.query, epoch_seconds=ETAG_EPOCH_SECONDS)
+    not_modified = conditional(request, response, etag, HTTP_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+
+    if FAST_JSON_RESPONSES:
+        payload_key = ("reviews", id, version, all, cursor, limit)
+        payload = payload_cache.get(payload_key)
+        if payload is MISSING:
+            payload = PrecompressedPayload(json_bytes(await query_reviews(db, id, all, cursor, limit)))
+            if review_versions.get(id) == version:
+                payload_cache.set(payload_key, payload)
+        return await cached_json_response(request, payload, etag)
+    return await query_reviews(db, id, all, cursor, limit)
+
+
+REVIEW_LIST_COLUMNS = (
+    ReviewModel.author, ReviewModel.rating, ReviewModel.comment, ReviewModel.id, ReviewModel.created_at,
+)
+
+
+async def query_reviews(db, product_id, all, cursor, limit):
+    columns, descending = REVIEW_SORT
+    stmt = select(*REVIEW_LIST_COLUMNS).where(ReviewModel.product_id == product_id)
+    stmt_order = order_by_clauses(columns, descending)
+
+    # Ancien comportement (tous les avis) : ?all=true
+    if all:
+        return [dict(row._mapping) for row in await db.execute(stmt.order_by(*stmt_order))]
+
+    if cursor:
+        stmt = stmt.where(
+            keyset_filter(columns, decode_keyset_cursor(cursor, columns), descending)
+        )
+    items = [dict(row._mapping) for row in await db.execute(stmt.order_by(*stmt_order).limit(limit + 1))]
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor([items[-1]["created_at"], items[-1]["id"]])
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @app.post("/api/v1/products/{id}/reviews", response_model=ReviewSchema)
 def create_review(id: int, r: ReviewCreateSchema, db: Session = Depends(get_db)):
-    if not db.query(ProductModel).filter(ProductModel.id == id).first():
+    # Mise à jour atomique des agrégats (sert aussi de test d'existence du produit)
+    bucket = getattr(ProductModel, f"rating_{r.rating}")
+    updated = (
+        db.query(ProductModel)
+        .filter(ProductModel.id == id)
+        .update(
+            {
+                ProductModel.rating_count: ProductModel.rating_count + 1,
+                ProductModel.rating_sum: ProductModel.rating_sum + r.rating,
+                bucket: bucket + 1,
+            },
+            synchronize_session=False,
+        )
+    )
+    if not updated:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Produit introuvable")
 
     nr = ReviewModel(**r.dict(), product_id=id)
     db.add(nr)
     db.commit()
     db.refresh(nr)
+
+    # Les agrégats font partie de la fiche produit
+    product_cache.delete(id)
+    product_list_cache.clear()
+    payload_cache.clear()
+    catalog_version.bump()
+    review_versions.bump(id)
     return nr
 
 
@@ -406,58 +1189,133 @@ def create_review(id: int, r: ReviewCreateSchema, db: Session = Depends(get_db))
 
 @app.post("/api/v1/analytics")
 @app.post("/api/v1/activity")
-def track(e: AnalyticsSchema, db: Session = Depends(get_db)):
-    print(f"📥 Tracking reçu: {e.event_type} - {e.page_url}", flush=True)
-    try:
-        db.add(
-            EventModel(
-                event_type=e.event_type,
-                user_id=e.user_id,
-                page_url=e.page_url,
-                metadata_json=json.dumps(e.metadata),
-            )
+def track(e: AnalyticsSchema):
+    # Pas d'écriture DB ici : l'événement part dans le buffer, flush groupé en tâche de fond
+    product_id, product_name = event_product(e.metadata)
+    accepted = event_queue.offer(
+        {
+            "event_type": e.event_type,
+            "user_id": e.user_id,
+            "page_url": e.page_url,
+            "metadata_json": json.dumps(e.metadata),
+            "product_id": product_id,
+            "product_name": product_name,
+            "occurred_at": datetime.now(),
+        }
+    )
+    if not accepted:
+        # Buffer plein : on refuse plutôt que de saturer la mémoire / le pool DB
+        return JSONResponse(
+            status_code=503,
+            content={"status": "dropped"},
+            headers={"Retry-After": "1"},
         )
-        db.commit()
-        return {"status": "ok"}
-    except Exception as err:
-        print(f"❌ Erreur DB Tracking: {err}", flush=True)
-        return {"status": "error", "detail": str(err)}
+    return JSONResponse(status_code=202, content={"status": "queued"})
+
+
+def in_days(query, column, start: Optional[date], end: Optional[date]):
+    """Filtre une requête de rollup sur [start, end] (jours inclus)."""
+    if start:
+        query = query.filter(column >= start.isoformat())
+    if end:
+        query = query.filter(column <= end.isoformat())
+    return query
+
+
+FUNNEL_STEPS = "page_view,view_item,add_to_cart,purchase"
+
+
+@app.get("/api/v1/analytics/funnel")
+def get_funnel(
+    db: Session = Depends(get_db),
+    u: AdminUser = Depends(get_current_user),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    steps: str = Query(FUNNEL_STEPS, max_length=500),
+):
+    # Une seule requête groupée sur les rollups, quelle que soit la période
+    names = [step for step in steps.split(",") if step][:10]
+    counts = dict(
+        in_days(
+            db.query(DailyEventStat.event_type, func.sum(DailyEventStat.count)),
+            DailyEventStat.day, start, end,
+        )
+        .filter(DailyEventStat.event_type.in_(names))
+        .group_by(DailyEventStat.event_type)
+        .all()
+    )
+    first = counts.get(names[0], 0) if names else 0
+    funnel, previous = [], None
+    for name in names:
+        n = counts.get(name, 0) or 0
+        funnel.append(
+            {
+                "step": name,
+                "count": n,
+                "rate": round(n / first, 4) if first else 0.0,  # depuis la 1re étape
+                "step_rate": round(n / previous, 4) if previous else None,  # depuis la précédente
+            }
+        )
+        previous = n
+    return {"start": start, "end": end, "steps": funnel}
 
 
 @app.get("/api/v1/analytics/stats")
-def get_analytics_stats(db: Session = Depends(get_db), u: AdminUser = Depends(get_current_user)):
+def get_analytics_stats(
+    db: Session = Depends(get_db),
+    u: AdminUser = Depends(get_current_user),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    top: int = Query(5, ge=1, le=100),
+):
+    # Tout est lu depuis les rollups quotidiens : quelques centaines de lignes max.
+    # start / end (inclus) limitent totaux, tunnel et top produits à une période.
     try:
-        total_events = db.query(EventModel).count()
-        orders_count = db.query(OrderModel).count()
-        total_sales = db.query(func.sum(OrderModel.total_amount)).scalar() or 0.0
+        per_type = dict(
+            in_days(
+                db.query(DailyEventStat.event_type, func.sum(DailyEventStat.count)),
+                DailyEventStat.day, start, end,
+            )
+            .group_by(DailyEventStat.event_type)
+            .all()
+        )
+        total_events = sum(per_type.values())
+
+        orders_count, total_sales = in_days(
+            db.query(
+                func.coalesce(func.sum(DailySalesStat.orders), 0),
+                func.coalesce(func.sum(DailySalesStat.revenue), 0.0),
+            ),
+            DailySalesStat.day, start, end,
+        ).one()
 
-        visits = db.query(EventModel).filter(EventModel.event_type == 'page_view').count()
-        interest = db.query(EventModel).filter(EventModel.event_type == 'view_item').count()
-        carts = db.query(EventModel).filter(EventModel.event_type == 'add_to_cart').count()
+        visits = per_type.get('page_view', 0)
+        interest = per_type.get('view_item', 0)
+        carts = per_type.get('add_to_cart', 0)
 
         today = datetime.now()
         chart_30 = { (today - timedelta(days=i)).strftime("%Y-%m-%d"): 0 for i in range(29, -1, -1) }
         chart_7 = { (today - timedelta(days=i)).strftime("%Y-%m-%d"): 0 for i in range(6, -1, -1) }
-        
-        orders = db.query(OrderModel).all()
-        for o in orders:
-            d_str = str(o.created_at)[:10] 
+
+        for d_str, amount in db.query(DailySalesStat.day, DailySalesStat.revenue).filter(
+            DailySalesStat.day >= min(chart_30)
+        ):
             if d_str in chart_30:
-                chart_30[d_str] += (o.total_amount or 0)
+                chart_30[d_str] += (amount or 0)
             if d_str in chart_7:
-                chart_7[d_str] += (o.total_amount or 0)
+                chart_7[d_str] += (amount or 0)
 
-        top_products = {}
-        try:
-            view_events = db.query(EventModel).filter(EventModel.event_type == 'view_item').limit(500).all()
-            for ev in view_events:
-                if ev.metadata_json:
-                    meta = json.loads(ev.metadata_json)
-                    name = meta.get('name', 'Inconnu')
-                    top_products[name] = top_products.get(name, 0) + 1
-            top_products = dict(sorted(top_products.items(), key=lambda item: item[1], reverse=True)[:5])
-        except Exception:
-            pass
+        views = func.sum(DailyProductView.views)
+        top_products = dict(
+            in_days(
+                db.query(DailyProductView.product_name, views),
+                DailyProductView.day, start, end,
+            )
+            .group_by(DailyProductView.product_name)
+            .order_by(views.desc())
+            .limit(top)
+            .all()
+        )
 
         return {
             "summary": {
@@ -490,40 +1348,152 @@ def get_analytics_stats(db: Session = Depends(get_db), u: AdminUser = Depends(ge
         }
 
 
+ORDER_SORT = ([OrderModel.placed_at, OrderModel.id], [True, True])
+
+
+def filtered_orders(status, start, end, email):
+    stmt = select(OrderModel).options(selectinload(OrderModel.lines))
+    if status:
+        stmt = stmt.where(OrderModel.status == status)
+    if email:
+        stmt = stmt.where(OrderModel.customer_email == email)
+    if start:
+        stmt = stmt.where(OrderModel.placed_at >= start)
+    if end:
+        stmt = stmt.where(OrderModel.placed_at < end)
+    columns, descending = ORDER_SORT
+    return stmt.order_by(*order_by_clauses(columns, descending))
+
+
 @app.get("/api/v1/orders")
-def get_orders(db: Session = Depends(get_db), u: AdminUser = Depends(get_current_user)):
-    res = []
-    for o in (
-        db.query(OrderModel).order_by(OrderModel.created_at.desc()).limit(50).all()
-    ):
-        res.append(
-            {
-                "id": o.id,
-                "stripe_id": o.stripe_id,
-                "customer": o.customer_name,
-                "email": o.customer_email,
-                "amount": o.total_amount,
-                "status": o.status,
-                "date": o.created_at,
-                "items": json.loads(o.items_json) if o.items_json else [],
-                "address": json.loads(o.shipping_address_json)
-                if o.shipping_address_json
-                else {},
-            }
+def get_orders(
+    db: Session = Depends(get_db),
+    u: AdminUser = Depends(get_current_user),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    status: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    email: Optional[str] = None,
+):
+    stmt = filtered_orders(status, start, end, email)
+    columns, descending = ORDER_SORT
+    if cursor:
+        stmt = stmt.where(keyset_filter(columns, decode_keyset_cursor(cursor, columns), descending))
+
+    orders = db.scalars(stmt.limit(limit + 1)).all()
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        last = orders[-1]
+        next_cursor = encode_cursor([last.placed_at.isoformat(), last.id])
+    return {"items": [order_to_dict(o) for o in orders], "next_cursor": next_cursor}
+
+
+ORDER_CSV_COLUMNS = ["id", "stripe_id", "date", "customer", "email", "status", "amount", "items", "city"]
+
+
+def stream_orders(status, start, end, email, fmt, chunk_size=1000):
+    """Génère l'export par blocs depuis un curseur serveur (mémoire constante)."""
+    db = SessionLocal()
+    try:
+        stmt = filtered_orders(status, start, end, email).execution_options(
+            stream_results=True, yield_per=chunk_size
         )
-    return res
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == "csv":
+            writer.writerow(ORDER_CSV_COLUMNS)
+
+        for n, o in enumerate(db.scalars(stmt), start=1):
+            data = order_to_dict(o)
+            if fmt == "csv":
+                writer.writerow(
+                    [
+                        data["id"],
+                        data["stripe_id"],
+                        data["date"],
+                        data["customer"],
+                        data["email"],
+                        data["status"],
+                        data["amount"],
+                        "; ".join(f"{i['quantity']} x {i['name']}" for i in data["items"]),
+                        data["address"].get("city", ""),
+                    ]
+                )
+            else:
+                buffer.write(json.dumps(data, ensure_ascii=False) + "\n")
+            if n % chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    finally:
+        db.close()
+
+
+@app.get("/api/v1/orders/export")
+def export_orders(
+    u: AdminUser = Depends(get_current_user),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    status: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    email: Optional[str] = None,
+):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"orders-{datetime.now():%Y%m%d-%H%M}.{format}"
+    return StreamingResponse(
+        stream_orders(status, start, end, email, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.get("/api/v1/analytics/products")
+def get_product_sales(
+    db: Session = Depends(get_db),
+    u: AdminUser = Depends(get_current_user),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=500),
+):
+    # Chiffre d'affaires par produit : un GROUP BY indexé sur order_lines
+    revenue = func.sum(OrderLineModel.unit_price * OrderLineModel.quantity)
+    query = db.query(
+        OrderLineModel.product_id,
+        func.max(OrderLineModel.name),
+        func.sum(OrderLineModel.quantity),
+        revenue,
+    ).join(OrderModel, OrderModel.id == OrderLineModel.order_id)
+    if start:
+        query = query.filter(OrderModel.placed_at >= start)
+    if end:
+        query = query.filter(OrderModel.placed_at < end)
+    rows = (
+        query.group_by(OrderLineModel.product_id)
+        .order_by(revenue.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        {"product_id": pid, "name": name, "quantity": qty or 0, "revenue": rev or 0.0}
+        for pid, name, qty, rev in rows
+    ]
 
 # 👇 C'EST LA ROUTE QUI MANQUAIT POUR LA PAGE SUCCESS 👇
 @app.get("/api/v1/orders/by-session/{session_id}")
-def get_order_by_session(session_id: str, db: Session = Depends(get_db)):
-    order = db.query(OrderModel).filter(OrderModel.stripe_id == session_id).first()
+async def get_order_by_session(
+    session_id: str, db: AsyncSession = Depends(get_async_db)
+):
+    order = await db.scalar(select(OrderModel).where(OrderModel.stripe_id == session_id))
     if not order:
         raise HTTPException(status_code=404, detail="Commande non trouvée")
     
     return {
         "id": order.id,
         "total": order.total_amount,
-        "date": order.created_at,
+        "date": order.placed_at.isoformat() if order.placed_at else order.created_at,
         "status": order.status
     }
 # 👆 --------------------------------------------- 👆
@@ -531,25 +1501,44 @@ def get_order_by_session(session_id: str, db: Session = Depends(get_db)):
 
 # --- STRIPE ---
 
+async def resolve_cart(db: AsyncSession, items: List[CartItem]):
+    """[(id, nom, quantité, prix en centimes)] depuis le catalogue, en une requête."""
+    quantities = {}
+    for i in items:
+        quantities[i.id] = quantities.get(i.id, 0) + i.quantity
+    rows = await db.execute(
+        select(ProductModel.id, ProductModel.name, ProductModel.price).where(
+            ProductModel.id.in_(list(quantities))
+        )
+    )
+    products = {pid: (name, price) for pid, name, price in rows}
+    missing = [pid for pid in quantities if pid not in products]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Produits introuvables : {missing}")
+    return [
+        (pid, products[pid][0], min(qty, 99), int(round(products[pid][1] * 100)))
+        for pid, qty in quantities.items()
+    ]
+
+
 @app.post("/api/v1/create-checkout-session")
-def checkout(cart: CheckoutSchema):
-    if not stripe.api_key:
+async def checkout(cart: CheckoutSchema, db: AsyncSession = Depends(get_async_db)):
+    if STRIPE_BACKEND == "stripe" and not stripe.api_key:
         raise HTTPException(status_code=500, detail="Missing Stripe Key")
 
-    l_items = []
-    for i in cart.items:
-        l_items.append(
-            {
-                "price_data": {
-                    "currency": "eur",
-                    "product_data": {"name": i.name},
-                    "unit_amount": int(i.price * 100),
-                },
-                "quantity": 1,
-            }
-        )
-
-    s = stripe.checkout.Session.create(
+    lines = await resolve_cart(db, cart.items)
+    l_items = [
+        {
+            "price_data": {
+                "currency": "eur",
+                "product_data": {"name": name},
+                "unit_amount": cents,
+            },
+            "quantity": qty,
+        }
+        for _, name, qty, cents in lines
+    ]
+    params = dict(
         payment_method_types=["card"],
         line_items=l_items,
         mode="payment",
@@ -557,67 +1546,174 @@ def checkout(cart: CheckoutSchema):
         success_url=f"{FRONTEND_URL}/success?session_id={{CHECKOUT_SESSION_ID}}",
         cancel_url=f"{FRONTEND_URL}/cancel",
         shipping_address_collection={"allowed_countries": ["FR"]},
-        metadata={"items_summary": json.dumps([f"{i.name}" for i in cart.items])},
+        # Découpées en plusieurs clés au-delà de 500 caractères (limite Stripe)
+        metadata={
+            **split_metadata(
+                "items_summary",
+                json.dumps(
+                    [name[:CHECKOUT_NAME_MAX] for _, name, _, _ in lines],
+                    separators=(",", ":"),
+                    ensure_ascii=False,
+                ),
+            ),
+            # Lignes exploitables par le webhook : [id, quantité, prix en centimes]
+            **split_metadata(
+                "cart",
+                json.dumps([[pid, qty, cents] for pid, _, qty, cents in lines], separators=(",", ":")),
+            ),
+        },
     )
-    return {"checkout_url": s.url}
+
+    # Clé = checkout_id du navigateur + contenu exact du panier (un changement de
+    # prix => nouvelle session). Sans checkout_id : pas de réutilisation.
+    key = None
+    if cart.checkout_id:
+        key = cart_fingerprint(
+            cart.checkout_id, sorted([pid, qty, cents] for pid, _, qty, cents in lines)
+        )
+    try:
+        session = await checkout_client.get_or_create(key, params)
+    except StripeBusy:
+        raise HTTPException(
+            status_code=503, detail="Serveur occupé", headers={"Retry-After": "1"}
+        )
+    except StripeTimeout:
+        raise HTTPException(status_code=504, detail="Stripe ne répond pas")
+    except stripe.error.StripeError as e:
+        print(f"❌ Stripe checkout: {e}", flush=True)
+        raise HTTPException(status_code=502, detail="Erreur Stripe")
+    return {"checkout_url": session["url"]}
+
+
+def apply_stripe_event(db: Session, event: dict):
+    """Applique un événement Stripe. Idempotent : rejouer une session déjà
+    enregistrée ne crée ni commande, ni rollup, ni email en double."""
+    if event["type"] != "checkout.session.completed":
+        return
+
+    s = event["data"]["object"]
+    d = s.get("customer_details", {}) or {}
+    shp = s.get("shipping_details", {}) or {}
+    addr = shp.get("address") or d.get("address") or {}
+    items_list = json.loads(join_metadata(s.get("metadata") or {}, "items_summary") or "[]")
+    amount = (s.get("amount_total") or 0) / 100
+
+    placed_at = datetime.now()
+    created_at = placed_at.isoformat()
+    values = dict(
+        stripe_id=s.get("id"),
+        created_at=created_at,
+        placed_at=placed_at,
+        customer_email=d.get("email"),
+        customer_name=d.get("name"),
+        total_amount=amount,
+        status="paid",
+        shipping_address=addr,
+    )
+    stmt = dialect_insert(db, OrderModel.__table__)
+    if stmt is None:
+        if db.query(OrderModel.id).filter(OrderModel.stripe_id == s.get("id")).first():
+            return
+        order = OrderModel(**values)
+        db.add(order)
+        db.flush()
+        order_id = order.id
+    else:
+        # INSERT ... ON CONFLICT (stripe_id) DO NOTHING RETURNING id
+        order_id = db.execute(
+            stmt.values(**values)
+            .on_conflict_do_nothing(index_elements=["stripe_id"])
+            .returning(OrderModel.id)
+        ).scalar()
+        if order_id is None:
+            return  # session déjà traitée
+
+    db.add_all(
+        OrderLineModel(order_id=order_id, **line) for line in order_lines_from_session(s)
+    )
+    db.add(
+        EventModel(
+            event_type="purchase",
+            user_id=d.get("email"),
+            page_url="/success",
+            metadata_json=json.dumps({"amt": amount}),
+            occurred_at=placed_at,
+        )
+    )
+    record_event_rollups(db, [{"event_type": "purchase", "occurred_at": placed_at}])
+    record_order_rollup(db, created_at, amount)
+
+    # Email de confirmation : écrit dans l'outbox, dans la même transaction
+    if d.get("email"):
+        db.add(
+            OutboxMessage(
+                kind="order_confirmation_email",
+                payload={
+                    "to": d.get("email"),
+                    "name": d.get("name") or "Client",
+                    "amount": amount,
+                    "items": items_list,
+                    "address": addr,
+                },
+            )
+        )
+
+
+def store_stripe_event(db: Session, event: dict, payload: str, status: str):
+    """Enregistre l'événement (clé unique event_id). Retourne False si déjà reçu."""
+    event_id = event.get("id") or f'{event["type"]}:{event["data"]["object"].get("id")}'
+    values = dict(
+        event_id=event_id,
+        event_type=event["type"],
+        payload=payload,
+        status=status,
+        received_at=datetime.now(),
+        processed_at=datetime.now() if status == INBOX_PROCESSED else None,
+    )
+    stmt = dialect_insert(db, StripeEventModel.__table__)
+    if stmt is None:
+        if db.query(StripeEventModel.id).filter_by(event_id=event_id).first():
+            return False
+        db.add(StripeEventModel(**values))
+        return True
+    inserted = db.execute(
+        stmt.values(**values)
+        .on_conflict_do_nothing(index_elements=["event_id"])
+        .returning(StripeEventModel.id)
+    ).scalar()
+    return inserted is not None
 
 
 @app.post("/api/v1/webhook")
-async def webhook(req: Request, bg: BackgroundTasks, db: Session = Depends(get_db)):
+async def webhook(
+    req: Request, db: AsyncSession = Depends(get_async_db)
+):
     payload = await req.body()
     sig = req.headers.get("stripe-signature")
 
     try:
         if STRIPE_WEBHOOK_SECRET:
-            event = stripe.Webhook.construct_event(
-                payload, sig, STRIPE_WEBHOOK_SECRET
-            )
-        else:
-            event = json.loads(payload)
+            stripe.Webhook.construct_event(payload, sig, STRIPE_WEBHOOK_SECRET)
+        # Signature vérifiée : on travaille sur le JSON brut
+        event = json.loads(payload)
     except Exception:
         raise HTTPException(status_code=400)
 
-    if event["type"] == "checkout.session.completed":
-        s = event["data"]["object"]
-        d = s.get("customer_details", {}) or {}
-        shp = s.get("shipping_details", {}) or {}
-        addr = shp.get("address") or d.get("address") or {}
-        items_str = s.get("metadata", {}).get("items_summary", "[]")
-        items_list = json.loads(items_str)
+    def handle(sync_db: Session):
+        if STRIPE_WEBHOOK_MODE == "queue":
+            # Réponse immédiate, le processeur appliquera l'événement
+            return store_stripe_event(sync_db, event, payload.decode(), INBOX_PENDING)
+        if not store_stripe_event(sync_db, event, payload.decode(), INBOX_PROCESSED):
+            return False
+        apply_stripe_event(sync_db, event)
+        return True
 
-        db.add(
-            OrderModel(
-                stripe_id=s.get("id"),
-                customer_email=d.get("email"),
-                customer_name=d.get("name"),
-                total_amount=s.get("amount_total", 0) / 100,
-                status="paid",
-                items_json=items_str,
-                shipping_address_json=json.dumps(addr),
-            )
-        )
+    is_new = await db.run_sync(handle)
+    await db.commit()
+    return {"status": "success" if is_new else "duplicate"}
 
-        db.add(
-            EventModel(
-                event_type="purchase",
-                user_id=d.get("email"),
-                page_url="/success",
-                metadata_json=json.dumps({"amt": s.get("amount_total", 0) / 100}),
-            )
-        )
-        db.commit()
 
-        if d.get("email"):
-            bg.add_task(
-                send_confirmation_email,
-                d.get("email"),
-                d.get("name") or "Client",
-                s.get("amount_total", 0) / 100,
-                items_list,
-                addr,
-            )
-
-    return {"status": "success"}
+stripe_event_processor = InboxProcessor(SessionLocal, StripeEventModel, apply_stripe_event)
 
 
 # --- SEED & STARTUP ---
@@ -625,6 +1721,12 @@ async def webhook(req: Request, bg: BackgroundTasks, db: Session = Depends(get_d
 def force_reset_admin(db: Session):
     existing = db.query(AdminUser).filter(AdminUser.username == ADMIN_USERNAME).first()
     if existing:
+        # Mot de passe inchangé : ni nouveau hash bcrypt, ni commit
+        if verify_password(ADMIN_PASSWORD, existing.hashed_password) and not pwd_context.needs_update(
+            existing.hashed_password
+        ):
+            print(f"✅ ADMIN OK: {ADMIN_USERNAME}", flush=True)
+            return
         existing.hashed_password = get_password_hash(ADMIN_PASSWORD)
         print(f"🔄 ADMIN UPDATE: {ADMIN_USERNAME}", flush=True)
     else:
@@ -636,38 +1738,111 @@ def force_reset_admin(db: Session):
         )
         print(f"👑 ADMIN CREATE: {ADMIN_USERNAME}", flush=True)
     db.commit()
+    # Mot de passe changé : plus aucun token ne doit être servi depuis le cache
+    token_cache.clear()
 
 
 @app.post("/api/v1/seed")
 def seed_database(db: Session = Depends(get_db)):
     # Pas de produits fictifs en production (si DATABASE_URL est présent)
     if not DATABASE_URL and db.query(ProductModel).count() == 0:
-        db.add(
-            ProductModel(
-                name="Empire Gold (Démo Local)",
-                price=1299.0,
-                category="Luxe",
-                image_url="https://images.unsplash.com/photo-1523275335684-37898b6baf30?w=800",
-            )
+        demo = ProductModel(
+            name="Empire Gold (Démo Local)",
+            price=1299.0,
+            category="Luxe",
+            image_url="https://images.unsplash.com/photo-1523275335684-37898b6baf30?w=800",
         )
+        db.add(demo)
+        db.flush()
+        product_search.index_product(db, demo)
         db.commit()
+        product_list_cache.clear()
+        payload_cache.clear()
+        facet_index.upsert(demo.id, demo.category, demo.price)
+        catalog_version.bump()
 
     force_reset_admin(db)
     return {"message": "Checked"}
 
 
+inline_outbox_worker = None
+events_maintenance_stop = threading.Event()
+# Durées du dernier démarrage (exposées dans /admin/runtime)
+STARTUP_TIMINGS = {}
+
+
+def events_maintenance_loop():
+    while not events_maintenance_stop.wait(EVENTS_MAINTENANCE_INTERVAL):
+        try:
+            run_events_maintenance()
+        except Exception as e:
+            print(f"❌ Maintenance analytics_events : {e}", flush=True)
+
+
 @app.on_event("startup")
 def startup_event():
-    db = SessionLocal()
-    print("🚀 Démarrage : Création des tables...", flush=True)
+    started = time.perf_counter()
     try:
-        Base.metadata.create_all(bind=engine)
-        print("✅ Tables créées avec succès.", flush=True)
-        seed_database(db)
+        if SCHEMA_AUTO_MIGRATE:
+            print("🚀 Démarrage : migration du schéma (local)...", flush=True)
+            migrate(engine, MIGRATIONS)
+            db = SessionLocal()
+            try:
+                seed_database(db)
+            finally:
+                db.close()
+        else:
+            version = check_schema(engine, MIGRATIONS)
+            print(f"🚀 Démarrage : schéma en version {version}", flush=True)
+        # Lecture seule : ce que les migrations ont créé (partitions, index plein texte)
+        event_partitions.detect(engine)
+        product_search.detect(engine)
+    except SchemaOutdated as e:
+        # Code plus récent que la base : on refuse de servir plutôt que d'échouer requête par requête
+        print(f"❌ {e}", flush=True)
+        raise
     except Exception as e:
         print(f"❌ ERREUR CRITIQUE DATABASE : {e}", flush=True)
-    finally:
-        db.close()
+    STARTUP_TIMINGS["schema_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    event_queue.start()
+    if EVENTS_MAINTENANCE_INTERVAL > 0:
+        events_maintenance_stop.clear()
+        threading.Thread(
+            target=events_maintenance_loop, name="events-maintenance", daemon=True
+        ).start()
+    if STRIPE_WEBHOOK_MODE == "queue":
+        stripe_event_processor.start()
+    if OUTBOX_INLINE_WORKER:
+        global inline_outbox_worker
+        inline_outbox_worker = make_outbox_worker()
+        threading.Thread(
+            target=inline_outbox_worker.run_forever, name="outbox", daemon=True
+        ).start()
+    STARTUP_TIMINGS["startup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    STARTUP_TIMINGS["budget_ms"] = STARTUP_BUDGET_MS
+    if STARTUP_TIMINGS["startup_ms"] > STARTUP_BUDGET_MS:
+        print(
+            f"⚠️  Démarrage lent : {STARTUP_TIMINGS['startup_ms']} ms (budget {STARTUP_BUDGET_MS:g} ms)",
+            flush=True,
+        )
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    events_maintenance_stop.set()
+    stripe_event_processor.stop()
+    if inline_outbox_worker:
+        inline_outbox_worker.stop()
+    # On vide le buffer analytics avant de rendre la main
+    event_queue.stop()
+    print(f"🛑 Arrêt : analytics flush final ({event_queue.flushed} events écrits)", flush=True)
+
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await async_engine.dispose()
+    password_hasher.shutdown()
+    checkout_client.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,332 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+
+# ==============================================================================
+# COMMANDES D'ADMINISTRATION (hors requêtes HTTP)
+# ==============================================================================
+# Usage : python manage.py <commande>
+
+
+def migrate_schema(args):
+    from app.core.migrations import current_version, latest_version, load_migrations, migrate
+    from main import SessionLocal, engine, event_partitions, seed_database
+
+    migrations = load_migrations()
+    if args.status:
+        with engine.connect() as conn:
+            current = current_version(conn)
+        for m in migrations:
+            mark = "✅" if m.VERSION <= current else "⏳"
+            print(f"{mark} {m.VERSION:>4} {m.DESCRIPTION}", flush=True)
+        print(f"Schéma en version {current} / {latest_version(migrations)}", flush=True)
+        return
+    applied = migrate(engine, migrations, target=args.target)
+    print(f"✅ {len(applied)} migration(s) appliquée(s) {applied}", flush=True)
+    # À chaque déploiement : partitions des mois à venir + admin à jour
+    event_partitions.ensure(engine)
+    db = SessionLocal()
+    try:
+        seed_database(db)
+    finally:
+        db.close()
+
+
+# Lancé dans un interpréteur neuf : on mesure un vrai démarrage à froid
+STARTUP_PROBE = """
+import asyncio, json, time
+t0 = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def cycle():
+    await main.app.router.startup()
+    started = time.perf_counter()
+    await main.app.router.shutdown()
+    return started
+
+started = asyncio.run(cycle())
+print("STARTUP_TIMINGS " + json.dumps({
+    "import_ms": round((imported - t0) * 1000, 1),
+    "startup_ms": round((started - imported) * 1000, 1),
+    "total_ms": round((started - t0) * 1000, 1),
+    "budget_ms": main.STARTUP_BUDGET_MS,
+}))
+"""
+
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_startup(runs=3, fresh=True):
+    """Meilleur de `runs` démarrages à froid (dict des temps, None si échec).
+
+    `fresh` : base SQLite neuve dans un dossier temporaire, migrée avant la
+    mesure puis ouverte en mode production (SCHEMA_AUTO_MIGRATE=0) : le temps
+    ne dépend ni de la base locale ni du coût des migrations."""
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = BACKEND_DIR
+        if fresh:
+            cwd = tmp
+            env.pop("DATABASE_URL", None)
+            migrated = subprocess.run(
+                [sys.executable, os.path.join(BACKEND_DIR, "manage.py"), "migrate"],
+                cwd=cwd, env=env, capture_output=True, text=True,
+            )
+            if migrated.returncode != 0:
+                print(migrated.stdout + migrated.stderr, flush=True)
+                return None
+            env["SCHEMA_AUTO_MIGRATE"] = "0"
+        best = None
+        for _ in range(runs):
+            proc = subprocess.run(
+                [sys.executable, "-c", STARTUP_PROBE], cwd=cwd, env=env, capture_output=True, text=True
+            )
+            lines = [line for line in proc.stdout.splitlines() if line.startswith("STARTUP_TIMINGS ")]
+            if proc.returncode != 0 or not lines:
+                print(proc.stdout + proc.stderr, flush=True)
+                return None
+            timings = json.loads(lines[-1].split(" ", 1)[1])
+            if best is None or timings["total_ms"] < best["total_ms"]:
+                best = timings
+    return best
+
+
+def check_startup(args):
+    timings = measure_startup(runs=args.runs, fresh=not args.current_db)
+    if timings is None:
+        print("❌ Le démarrage a échoué", flush=True)
+        return 1
+    budget = args.budget_ms or timings["budget_ms"]
+    print(
+        f"⏱️ import {timings['import_ms']} ms + startup {timings['startup_ms']} ms "
+        f"= {timings['total_ms']} ms (meilleur de {args.runs}, budget {budget:g} ms)",
+        flush=True,
+    )
+    if timings["total_ms"] > budget:
+        print("❌ Budget de démarrage dépassé", flush=True)
+        return 1
+    print("✅ Démarrage dans le budget", flush=True)
+    return 0
+
+
+# Reprises déjà passées par les migrations 3, 4, 6 et 7 : ces commandes
+# servent à les relancer à la main (ex : après une correction de données).
+
+def backfill_rollups(args):
+    from app.core.rollups import rebuild_rollups
+    from main import DailyEventStat, DailyProductView, DailySalesStat, OrderModel, engine, event_partitions
+
+    print("📊 Recalcul des rollups analytics...", flush=True)
+    event_partitions.detect(engine)
+    with engine.begin() as conn:
+        rebuild_rollups(
+            conn,
+            event_partitions.sources(conn),
+            OrderModel.__table__,
+            DailyEventStat.__table__,
+            DailySalesStat.__table__,
+            DailyProductView.__table__,
+            chunk_size=args.chunk_size,
+        )
+    print("✅ Rollups à jour.", flush=True)
+
+
+def backfill_review_aggregates(args):
+    from app.core.backfill import rebuild_review_aggregates
+    from main import ProductModel, ReviewModel, engine
+
+    print("⭐ Recalcul des agrégats d'avis...", flush=True)
+    rebuild_review_aggregates(engine, ProductModel.__table__, ReviewModel.__table__)
+    print("✅ Agrégats à jour.", flush=True)
+
+
+def migrate_orders(args):
+    from app.core.backfill import migrate_legacy_orders
+    from main import OrderLineModel, OrderModel, ProductModel, engine
+
+    print("📦 Migration des commandes (JSON texte -> colonnes typées)...", flush=True)
+    n = migrate_legacy_orders(
+        engine,
+        OrderModel.__table__,
+        OrderLineModel.__table__,
+        ProductModel.__table__,
+        chunk_size=args.chunk_size,
+    )
+    print(f"✅ {n} commandes migrées.", flush=True)
+
+
+def migrate_events(args):
+    from app.core.backfill import backfill_event_timestamps
+    from main import EventModel, engine, event_partitions
+
+    if engine.dialect.name == "postgresql":
+        print("🗂️ Conversion de analytics_events en table partitionnée par mois...", flush=True)
+        n = event_partitions.convert(engine)
+        print(f"✅ {n} événements recopiés dans les partitions.", flush=True)
+        return
+    print("🗂️ Remplissage de occurred_at depuis created_at...", flush=True)
+    n = backfill_event_timestamps(engine, EventModel.__table__, chunk_size=args.chunk_size)
+    print(f"✅ {n} événements mis à jour.", flush=True)
+
+
+def events_maintenance(args):
+    from main import run_events_maintenance
+
+    result = run_events_maintenance()
+    print(
+        f"🧹 {result['moved']} événements archivés par mois, "
+        f"{len(result['expired'])} mois expirés {result['expired']}",
+        flush=True,
+    )
+
+
+def export_events(args):
+    from sqlalchemy import create_engine
+
+    from app.core.export import EventExporter
+    from main import engine, event_partitions
+
+    # Idéalement sur un réplica en lecture pour ne pas charger la base de prod
+    source_engine = create_engine(args.database_url) if args.database_url else engine
+    try:
+        exporter = EventExporter(
+            args.out, fmt=args.format, chunk_size=args.chunk_size, compression=args.compression
+        )
+    except RuntimeError as e:  # pyarrow absent de cet environnement
+        print(f"❌ {e}", flush=True)
+        return 1
+    with source_engine.connect() as conn:
+        n = exporter.run(conn, event_partitions.sources(conn))
+    print(f"✅ {n} événements exportés dans {args.out} (reprise : {exporter.state_path})", flush=True)
+
+
+def outbox_worker(args):
+    from main import make_outbox_worker
+
+    options = {"concurrency": args.concurrency} if args.concurrency else {}
+    worker = make_outbox_worker(**options)
+    if args.once:
+        n = worker.run_once()
+        print(f"📮 {n} messages traités ({worker.stats()})", flush=True)
+        return
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+def stripe_events(args):
+    from main import stripe_event_processor
+
+    if args.once:
+        n = stripe_event_processor.run_once()
+        print(f"💳 {n} événements Stripe traités", flush=True)
+        return
+    print("💳 Processeur d'événements Stripe démarré", flush=True)
+    try:
+        stripe_event_processor.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def dedupe_orders(args):
+    from main import OrderModel, SessionLocal
+    from sqlalchemy import func
+
+    db = SessionLocal()
+    try:
+        keep = (
+            db.query(func.min(OrderModel.id))
+            .filter(OrderModel.stripe_id.isnot(None))
+            .group_by(OrderModel.stripe_id)
+        )
+        duplicates = (
+            db.query(OrderModel)
+            .filter(OrderModel.stripe_id.isnot(None), OrderModel.id.notin_(keep))
+            .all()
+        )
+        for o in duplicates:
+            db.delete(o)
+        db.commit()
+        print(f"🧹 {len(duplicates)} commandes en double supprimées.", flush=True)
+    finally:
+        db.close()
+
+
+def rebuild_search_index(args):
+    from main import engine, product_search
+
+    product_search.ensure(engine)
+    with engine.begin() as conn:
+        n = product_search.rebuild(conn)
+    print(f"🔎 {n} produits indexés.", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Empire E-commerce - administration")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("migrate", help="Applique les migrations du schéma puis crée / met à jour l'admin")
+    p.add_argument("--status", action="store_true", help="Affiche les migrations appliquées sans rien changer")
+    p.add_argument("--target", type=int, default=None, help="S'arrête à cette version")
+    p.set_defaults(func=migrate_schema)
+
+    p = sub.add_parser("check-startup", help="Mesure un démarrage à froid de l'API (code 1 si hors budget)")
+    p.add_argument("--budget-ms", type=float, default=None, help="Sinon STARTUP_BUDGET_MS")
+    p.add_argument("--runs", type=int, default=3, help="Mesures ; on garde la meilleure")
+    p.add_argument("--current-db", action="store_true", help="Base configurée au lieu d'une base neuve migrée")
+    p.set_defaults(func=check_startup)
+
+    p = sub.add_parser("backfill-rollups", help="Reconstruit les rollups quotidiens depuis les tables brutes")
+    p.add_argument("--chunk-size", type=int, default=10_000)
+    p.set_defaults(func=backfill_rollups)
+
+    p = sub.add_parser("backfill-review-aggregates", help="Recalcule note moyenne / histogramme de chaque produit")
+    p.set_defaults(func=backfill_review_aggregates)
+
+    p = sub.add_parser("migrate-orders", help="Remplit order_lines / placed_at depuis les anciennes colonnes JSON")
+    p.add_argument("--chunk-size", type=int, default=1000)
+    p.set_defaults(func=migrate_orders)
+
+    p = sub.add_parser("migrate-events", help="analytics_events : occurred_at (SQLite) / partitionnement par mois (PostgreSQL)")
+    p.add_argument("--chunk-size", type=int, default=5000)
+    p.set_defaults(func=migrate_events)
+
+    p = sub.add_parser("events-maintenance", help="Crée les partitions à venir, range les vieux mois, applique la rétention")
+    p.set_defaults(func=events_maintenance)
+
+    p = sub.add_parser("export-events", help="Exporte les nouveaux événements en Parquet / Arrow (par jour et type)")
+    p.add_argument("--out", default="exports/events")
+    p.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    p.add_argument("--compression", default="zstd")
+    p.add_argument("--chunk-size", type=int, default=50_000)
+    p.add_argument("--database-url", default=None, help="Base à lire (réplica), sinon DATABASE_URL")
+    p.set_defaults(func=export_events)
+
+    p = sub.add_parser("outbox-worker", help="Envoie les messages de l'outbox (emails) en continu")
+    p.add_argument("--once", action="store_true", help="Traite un seul lot puis s'arrête")
+    p.add_argument("--concurrency", type=int, default=None)
+    p.set_defaults(func=outbox_worker)
+
+    p = sub.add_parser("stripe-events", help="Applique les événements Stripe en attente (mode queue)")
+    p.add_argument("--once", action="store_true", help="Traite un seul lot puis s'arrête")
+    p.set_defaults(func=stripe_events)
+
+    p = sub.add_parser("dedupe-orders", help="Supprime les commandes en double (même stripe_id), comme la migration 5")
+    p.set_defaults(func=dedupe_orders)
+
+    p = sub.add_parser("rebuild-search-index", help="Réindexe tout le catalogue pour la recherche (SQLite FTS5)")
+    p.set_defaults(func=rebuild_search_index)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
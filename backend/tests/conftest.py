@@ -0,0 +1,41 @@
+import os
+import sys
+
+# Les tests importent app/ et manage.py comme le fait l'API (cwd = backend/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+
+
+@pytest.fixture
+def sqlite_session(tmp_path):
+    """Fabrique de sessions sur une base SQLite neuve (schéma des modèles)."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def client(tmp_path_factory):
+    """Client HTTP sur l'API complète, base SQLite locale dans un dossier temporaire.
+
+    main est importé une seule fois : le dossier courant reste celui de la base
+    (URL SQLite relative) jusqu'à la fin de la session de tests."""
+    os.chdir(tmp_path_factory.mktemp("api"))
+    os.environ.update(
+        STRIPE_BACKEND="stub",
+        EMAIL_BACKEND="fake",
+        OUTBOX_INLINE_WORKER="0",
+        EVENTS_MAINTENANCE_INTERVAL="0",
+    )
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as c:
+        yield c
@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.checkout import (
+    CheckoutClient, StripeBusy, StubStripeAPI, cart_fingerprint, join_metadata, split_metadata,
+)
+
+PARAMS = {"success_url": "https://shop/success?session_id={CHECKOUT_SESSION_ID}"}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_same_key_reuses_the_session():
+    api = StubStripeAPI()
+    client = CheckoutClient(api, reuse_ttl=60)
+    key = cart_fingerprint("browser-a", [[1, 2, 300]])
+
+    async def twice():
+        return await client.get_or_create(key, PARAMS), await client.get_or_create(key, PARAMS)
+
+    first, second = run(twice())
+    assert first == second
+    assert len(api.calls) == 1 and client.stats()["reused"] == 1
+    assert api.calls[0]["idempotency_key"].startswith(f"checkout-{key}-")
+
+
+def test_concurrent_clicks_share_one_stripe_call():
+    api = StubStripeAPI(delay=0.05)
+    client = CheckoutClient(api)
+    key = cart_fingerprint("browser-a", [[1, 1, 100]])
+
+    async def clicks():
+        return await asyncio.gather(*[client.get_or_create(key, PARAMS) for _ in range(5)])
+
+    sessions = run(clicks())
+    assert len({s["id"] for s in sessions}) == 1
+    assert len(api.calls) == 1
+
+
+def test_other_browser_or_no_key_gets_its_own_session():
+    api = StubStripeAPI()
+    client = CheckoutClient(api)
+    cart = [[1, 1, 100]]
+
+    async def sessions():
+        return [
+            await client.get_or_create(cart_fingerprint("browser-a", cart), PARAMS),
+            await client.get_or_create(cart_fingerprint("browser-b", cart), PARAMS),
+            await client.get_or_create(None, PARAMS),
+            await client.get_or_create(None, PARAMS),
+        ]
+
+    ids = [s["id"] for s in run(sessions())]
+    assert len(set(ids)) == 4
+    assert [c["idempotency_key"] for c in api.calls][2:] == [None, None]
+
+
+def test_too_many_pending_calls_are_rejected():
+    client = CheckoutClient(StubStripeAPI(delay=0.05), max_pending=1)
+
+    async def burst():
+        return await asyncio.gather(
+            client.get_or_create(None, PARAMS), client.get_or_create(None, PARAMS), return_exceptions=True
+        )
+
+    results = run(burst())
+    assert sum(isinstance(r, StripeBusy) for r in results) == 1
+
+
+def test_metadata_split_respects_stripe_limit():
+    cart = json.dumps([[n, 99, 999_999] for n in range(50)], separators=(",", ":"))
+    metadata = split_metadata("cart", cart)
+
+    assert len(metadata) > 1 and all(len(v) <= 500 for v in metadata.values())
+    assert join_metadata(metadata, "cart") == cart
+    # Sessions créées avant le découpage : une seule clé
+    assert join_metadata({"cart": "[[1,2,3]]"}, "cart") == "[[1,2,3]]"
+    assert join_metadata({}, "cart") == ""
+
+
+@pytest.mark.parametrize("value", ["", "x" * 500, "x" * 501])
+def test_metadata_split_round_trips(value):
+    assert join_metadata(split_metadata("k", value), "k") == value
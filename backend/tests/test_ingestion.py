@@ -0,0 +1,52 @@
+from sqlalchemy import func, select
+
+from app.core.ingestion import EventIngestionQueue
+from app.models import EventModel
+
+
+def count_events(session_factory):
+    with session_factory() as db:
+        return db.scalar(select(func.count()).select_from(EventModel))
+
+
+def test_stop_drains_every_buffered_event(sqlite_session):
+    queue = EventIngestionQueue(sqlite_session, EventModel.__table__, batch_size=2, flush_interval=60)
+    for n in range(5):
+        assert queue.offer({"event_type": "page_view", "user_id": str(n)})
+    queue.stop()  # jamais démarrée : stop() vide quand même le buffer
+
+    assert count_events(sqlite_session) == 5
+    assert queue.stats()["pending"] == 0
+    assert queue.flushed == 5 and queue.batches == 3
+
+
+def test_offer_drops_when_buffer_is_full(sqlite_session):
+    queue = EventIngestionQueue(sqlite_session, EventModel.__table__, batch_size=2, max_pending=3)
+    accepted = [queue.offer({"event_type": "click"}) for _ in range(5)]
+
+    assert accepted == [True, True, True, False, False]
+    assert queue.dropped == 2
+    queue.stop()
+    assert count_events(sqlite_session) == 3
+
+
+def test_failed_batch_is_counted_as_dropped(sqlite_session):
+    def broken_rollups(db, batch):
+        raise RuntimeError("rollup")
+
+    queue = EventIngestionQueue(sqlite_session, EventModel.__table__, on_flush=broken_rollups)
+    queue.offer({"event_type": "click"})
+    queue.stop()
+
+    assert queue.failed_batches == 1 and queue.dropped == 1
+    assert count_events(sqlite_session) == 0  # l'INSERT est annulé avec le hook
+
+
+def test_background_thread_flushes_full_batches(sqlite_session):
+    queue = EventIngestionQueue(sqlite_session, EventModel.__table__, batch_size=3, flush_interval=60)
+    queue.start()
+    for _ in range(3):
+        queue.offer({"event_type": "click"})
+    queue.stop()
+
+    assert count_events(sqlite_session) == 3
@@ -0,0 +1,27 @@
+from sqlalchemy import create_engine, inspect
+
+from app.core.migrations import current_version, latest_version, load_migrations, migrate
+from app.models import Base
+
+
+def test_migrations_build_the_model_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    migrations = load_migrations()
+    migrate(engine, migrations)
+
+    with engine.connect() as conn:
+        assert current_version(conn) == latest_version(migrations)
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        assert inspector.has_table(table.name), table.name
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        assert {c.name for c in table.columns} <= columns, table.name
+        indexes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        assert {ix.name for ix in table.indexes} <= indexes, table.name
+
+
+def test_migrations_are_idempotent(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    migrations = load_migrations()
+    migrate(engine, migrations)
+    assert migrate(engine, migrations) == []
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+from app.core.outbox import DEAD, PENDING, SENT, OutboxWorker
+from app.models import OutboxMessage
+
+
+def add_message(session_factory, kind="email"):
+    with session_factory() as db:
+        msg = OutboxMessage(kind=kind, payload={"to": "a@b.c"})
+        db.add(msg)
+        db.commit()
+        return msg.id
+
+
+def load(session_factory, msg_id):
+    with session_factory() as db:
+        return db.get(OutboxMessage, msg_id)
+
+
+def make_worker(session_factory, handler, **options):
+    options.setdefault("base_delay", 0.0)  # nouvel essai dû tout de suite
+    return OutboxWorker(session_factory, OutboxMessage, {"email": handler}, concurrency=1, **options)
+
+
+def test_successful_delivery_marks_message_sent(sqlite_session):
+    delivered = []
+    msg_id = add_message(sqlite_session)
+    worker = make_worker(sqlite_session, delivered.append)
+
+    assert worker.run_once() == 1
+    msg = load(sqlite_session, msg_id)
+    assert msg.status == SENT and msg.attempts == 1 and msg.sent_at is not None
+    assert delivered == [{"to": "a@b.c"}]
+    assert worker.run_once() == 0  # plus rien à envoyer
+
+
+def test_failure_is_retried_then_sent(sqlite_session):
+    calls = []
+
+    def flaky(payload):
+        calls.append(payload)
+        if len(calls) == 1:
+            raise ConnectionError("smtp down")
+
+    msg_id = add_message(sqlite_session)
+    worker = make_worker(sqlite_session, flaky)
+
+    worker.run_once()
+    msg = load(sqlite_session, msg_id)
+    assert msg.status == PENDING and msg.attempts == 1
+    assert msg.last_error == "ConnectionError: smtp down"
+
+    worker.run_once()
+    msg = load(sqlite_session, msg_id)
+    assert msg.status == SENT and msg.attempts == 2 and msg.last_error is None
+    assert worker.stats() == {"sent": 1, "retried": 1, "dead": 0}
+
+
+def test_too_many_failures_go_to_dead_letter(sqlite_session):
+    def always_fails(payload):
+        raise ValueError("bad address")
+
+    msg_id = add_message(sqlite_session)
+    worker = make_worker(sqlite_session, always_fails, max_attempts=3)
+    for _ in range(5):
+        worker.run_once()
+
+    msg = load(sqlite_session, msg_id)
+    assert msg.status == DEAD and msg.attempts == 3
+    assert worker.stats() == {"sent": 0, "retried": 2, "dead": 1}
+
+
+def test_unknown_kind_is_a_failure(sqlite_session):
+    msg_id = add_message(sqlite_session, kind="sms")
+    make_worker(sqlite_session, print, max_attempts=1).run_once()
+    assert load(sqlite_session, msg_id).status == DEAD
+
+
+def test_backoff_delays_the_next_attempt(sqlite_session):
+    def always_fails(payload):
+        raise ValueError("nope")
+
+    msg_id = add_message(sqlite_session)
+    worker = make_worker(sqlite_session, always_fails, base_delay=60.0)
+    worker.run_once()
+
+    msg = load(sqlite_session, msg_id)
+    assert msg.next_attempt_at > datetime.now() + timedelta(seconds=25)
+    assert worker.run_once() == 0  # pas encore dû
+
+
+def test_claim_leases_messages(sqlite_session):
+    add_message(sqlite_session)
+    worker = make_worker(sqlite_session, print)
+    assert len(worker.claim()) == 1
+    # Réservé : un second worker ne le reprend qu'à la fin du bail
+    assert make_worker(sqlite_session, print).claim() == []
@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.core.pagination import (
+    decode_cursor, decode_keyset_cursor, encode_cursor, keyset_filter, order_by_clauses,
+)
+from app.models import OrderModel, ProductModel
+
+PRICE_DESC = ([ProductModel.price, ProductModel.id], [True, False])
+
+
+def walk(session_factory, columns, descending, limit):
+    """Parcourt toutes les pages comme le fait l'API (curseur = dernière ligne)."""
+    seen, cursor = [], None
+    with session_factory() as db:
+        while True:
+            stmt = select(ProductModel)
+            if cursor:
+                stmt = stmt.where(keyset_filter(columns, decode_keyset_cursor(cursor, columns), descending))
+            page = db.scalars(stmt.order_by(*order_by_clauses(columns, descending)).limit(limit)).all()
+            if not page:
+                return seen
+            seen += [p.id for p in page]
+            cursor = encode_cursor([getattr(page[-1], c.key) for c in columns])
+
+
+def test_keyset_pages_cover_every_row_once(sqlite_session):
+    with sqlite_session() as db:
+        # Prix en double : l'id départage les ex aequo
+        db.add_all(ProductModel(name=f"P{n}", price=float(n % 4)) for n in range(23))
+        db.commit()
+        expected = [
+            p.id for p in db.scalars(select(ProductModel).order_by(ProductModel.price.desc(), ProductModel.id))
+        ]
+
+    for limit in (1, 5, 7, 23, 50):
+        assert walk(sqlite_session, *PRICE_DESC, limit) == expected
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor([12.5, 3]), 2) == [12.5, 3]
+
+
+@pytest.mark.parametrize("cursor", ["%%%", encode_cursor([1]), encode_cursor({"a": 1}), "bm9wZQ"])
+def test_malformed_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as err:
+        decode_cursor(cursor, 2)
+    assert err.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "values",
+    [["cheap", 1], [1.5, "1"], [1.5, 2 ** 70], [True, 1], [1.5, 1.5]],
+)
+def test_cursor_values_must_match_column_types(values):
+    with pytest.raises(HTTPException) as err:
+        decode_keyset_cursor(encode_cursor(values), PRICE_DESC[0])
+    assert err.value.status_code == 400
+
+
+def test_datetime_cursor_values_are_parsed():
+    columns = [OrderModel.placed_at, OrderModel.id]
+    assert decode_keyset_cursor(encode_cursor(["2025-01-02T10:00:00", 7]), columns) == [
+        datetime(2025, 1, 2, 10), 7,
+    ]
+    with pytest.raises(HTTPException):
+        decode_keyset_cursor(encode_cursor(["yesterday", 7]), columns)
@@ -0,0 +1,13 @@
+import os
+
+from manage import measure_startup
+
+# Budget de la CI : base neuve migrée, mode production, meilleur de 3 mesures
+# (les écarts d'une machine partagée ne font pas échouer le job)
+BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+
+def test_cold_start_within_budget():
+    timings = measure_startup(runs=3, fresh=True)
+    assert timings is not None, "le démarrage a échoué"
+    assert timings["total_ms"] <= BUDGET_MS, timings
@@ -0,0 +1,64 @@
+import json
+
+from sqlalchemy import func, select
+
+from app.models import OrderModel, OutboxMessage, StripeEventModel
+
+
+def checkout_completed(event_id, session_id):
+    return {
+        "id": event_id,
+        "type": "checkout.session.completed",
+        "data": {
+            "object": {
+                "id": session_id,
+                "amount_total": 4200,
+                "customer_details": {"email": "client@example.com", "name": "Client"},
+                "metadata": {"items_summary": '["Montre"]', "cart": "[[1,1,4200]]"},
+            }
+        },
+    }
+
+
+def count(model, *where):
+    import main
+
+    with main.SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(model).where(*where))
+
+
+def post(client, event):
+    return client.post("/api/v1/webhook", content=json.dumps(event))
+
+
+def test_replayed_event_is_a_duplicate(client):
+    event = checkout_completed("evt_replay", "cs_replay")
+
+    assert post(client, event).json() == {"status": "success"}
+    assert post(client, event).json() == {"status": "duplicate"}
+    assert count(StripeEventModel, StripeEventModel.event_id == "evt_replay") == 1
+    assert count(OrderModel, OrderModel.stripe_id == "cs_replay") == 1
+    assert count(OutboxMessage, OutboxMessage.payload["to"].as_string() == "client@example.com") >= 1
+
+
+def test_same_session_under_another_event_id_creates_one_order(client):
+    before = count(OutboxMessage)
+    assert post(client, checkout_completed("evt_first", "cs_twice")).status_code == 200
+    assert post(client, checkout_completed("evt_second", "cs_twice")).status_code == 200
+
+    assert count(OrderModel, OrderModel.stripe_id == "cs_twice") == 1
+    assert count(OutboxMessage) == before + 1  # un seul email de confirmation
+
+
+def test_order_lines_come_from_the_cart_metadata(client):
+    import main
+
+    post(client, checkout_completed("evt_lines", "cs_lines"))
+    with main.SessionLocal() as db:
+        order = db.scalars(select(OrderModel).where(OrderModel.stripe_id == "cs_lines")).one()
+        lines = [(line.product_id, line.name, line.unit_price, line.quantity) for line in order.lines]
+    assert lines == [(1, "Montre", 42.0, 1)]
+
+
+def test_invalid_payload_is_rejected(client):
+    assert client.post("/api/v1/webhook", content=b"not json").status_code == 400
@@ -3,7 +3,7 @@ import { useCart } from '../context/CartContext';
 import { X, Trash2, ShoppingBag, ArrowRight, Lock } from 'lucide-react';
 
 const CartPanel = () => {
-  const { isCartOpen, toggleCart, cart, removeFromCart } = useCart();
+  const { isCartOpen, toggleCart, cart, removeFromCart, getCheckoutId } = useCart();
   
   if (!isCartOpen) return null;
 
@@ -40,7 +40,7 @@ const CartPanel = () => {
         const response = await fetch(`${targetUrl}/create-checkout-session`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ items: cart })
+            body: JSON.stringify({ items: cart, checkout_id: getCheckoutId() })
         });
         
         if (!response.ok) {
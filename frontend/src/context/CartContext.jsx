@@ -57,6 +57,20 @@ export const CartProvider = ({ children }) => {
   const clearCart = () => {
     setCart([]);
     localStorage.removeItem('empire_cart');
+    localStorage.removeItem('empire_checkout_id');
+  };
+
+  // Identifiant aléatoire du panier : le backend ne réutilise une session Stripe
+  // que pour ce navigateur (double-clic, retour arrière), jamais pour un autre client
+  const getCheckoutId = () => {
+    let id = localStorage.getItem('empire_checkout_id');
+    if (!id) {
+      id = window.crypto?.randomUUID
+        ? window.crypto.randomUUID()
+        : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}-${Math.random().toString(36).slice(2)}`;
+      localStorage.setItem('empire_checkout_id', id);
+    }
+    return id;
   };
 
   const toggleCart = () => setIsCartOpen(!isCartOpen);
@@ -71,6 +85,7 @@ export const CartProvider = ({ children }) => {
       addToCart, 
       removeFromCart, 
       clearCart, 
+      getCheckoutId,
       isCartOpen, 
       toggleCart 
     }}>
@@ -161,7 +161,7 @@ const DashboardPage = () => {
         
         // 1. Produits
         try {
-            const prodRes = await fetch(`${API_URL}/products`);
+            const prodRes = await fetch(`${API_URL}/products?all=true`);
             if (prodRes.ok) setProducts(await prodRes.json());
             else throw new Error("Erreur chargement produits");
         } catch(e) { 
@@ -172,7 +172,7 @@ const DashboardPage = () => {
         // 2. Commandes
         try {
             const ordRes = await authFetch('/orders');
-            if (ordRes.ok) setOrders(await ordRes.json());
+            if (ordRes.ok) setOrders((await ordRes.json()).items);
         } catch(e) { console.warn("Commandes:", e); }
 
         // 3. Stats
@@ -110,7 +110,7 @@ const HomePage = () => {
   useEffect(() => {
     const fetchProducts = async () => {
       try {
-        const res = await fetch(`${API_URL}/products`);
+        const res = await fetch(`${API_URL}/products?all=true`);
         if (res.ok) {
           const data = await res.json();
           // On garde les produits réels s'ils existent, sinon fallback
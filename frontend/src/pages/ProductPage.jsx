@@ -90,7 +90,7 @@ const ProductPage = () => {
           const data = await res.json();
           setProduct(data);
           
-          const resAll = await fetch(`${API_URL}/products`).catch(() => null);
+          const resAll = await fetch(`${API_URL}/products?all=true`).catch(() => null);
           if (resAll && resAll.ok) {
             const all = await resAll.json();
             if (Array.isArray(all)) setRelatedProducts(all.filter(p => p.id !== parseInt(id)).slice(0, 3));